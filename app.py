@@ -1,16 +1,34 @@
 import streamlit as st
-from TikTokApi import TikTokApi
 import pandas as pd
-import asyncio
 import os
 import sys
 import logging
 from datetime import datetime
-import io
 import subprocess
+import time
+import uuid
+
+import engine
+from tokens import parse_tokens
+from urls import UrlPlan
+from ingest import SUPPORTED_TYPES, ColumnNotFound, read_column
+from webfetch import PageFetcher
+from journal import job_id_for
+from tracking import StatHistory
+from jobs import (
+    CREATOR_JOB, DONE, FAILED, MAX_PER_SESSION, MAX_RATE, MAX_SESSIONS, QUEUED, JobRunner,
+)
 
 # --- CONFIGURATION ---
 logging.getLogger("TikTokApi.tiktok").setLevel(logging.CRITICAL)
+UI_REFRESH_HZ = 4
+URL_MODE = "🎬 Video URLs"
+CREATOR_MODE = "👤 Creators"
+TRACK_MODE = "📈 Tracking"
+GROWTH_COLS = [
+    "unique_id", "play_count", "play_delta", "play_velocity", "play_growth",
+    "like_count", "like_delta", "share_count", "share_delta", "last_scraped", "next_due", "video_url",
+]
 
 st.set_page_config(
     page_title="TikTok Tracker Pro",
@@ -360,110 +378,210 @@ def setup_browser():
 setup_browser()
 
 
-# --- UTILITY FUNCTIONS ---
-def safe_int(value):
-    try:
-        if value is None: return 0
-        return int(value)
-    except:
-        return 0
-
-def format_number(n):
-    if n >= 1_000_000: return f"{n/1_000_000:.1f}M"
-    if n >= 1_000: return f"{n/1_000:.1f}K"
-    return str(n)
-
-def get_hashtags(text_extra):
-    if not text_extra: return ""
-    tags = [h.get("hashtagName") for h in text_extra if h.get("hashtagName")]
-    return ", ".join(tags)
+# --- SCRAPING LOGIC ---
+@st.cache_resource(show_spinner=False)
+def get_job_runner():
+    return JobRunner(pages=PageFetcher())
 
 
-# --- SCRAPING LOGIC ---
-async def get_video_info(url, api):
-    try:
-        video = api.video(url=url)
-        info = await video.info()
-        if not info:
-            return {"video_url": url, "error": "No data returned from TikTok"}
-
-        author = info.get("author", {})
-        author_stats = info.get("authorStats", {})
-        stats = info.get("stats", {})
-        stats_v2 = info.get("statsV2", {})
-        music = info.get("music", {})
-        video_data = info.get("video", {})
-
-        raw_time = info.get("createTime", 0)
-        try:
-            formatted_time = datetime.fromtimestamp(int(raw_time)).strftime("%Y-%m-%d %H:%M:%S")
-        except:
-            formatted_time = "N/A"
-
-        return {
-            "video_url": url,
-            "create_time": formatted_time,
-            "video_id": info.get("id") or video_data.get("id"),
-            "author_id": author.get("id"),
-            "unique_id": author.get("uniqueId"),
-            "nickname": author.get("nickname"),
-            "music_title": music.get("title"),
-            "is_copyrighted": music.get("isCopyrighted"),
-            "play_url": video_data.get("playAddr"),
-            "author_name": music.get("authorName"),
-            "hashtags": get_hashtags(info.get("textExtra")),
-            "follower_count": safe_int(author_stats.get("followerCount")),
-            "heart_count": safe_int(author_stats.get("heart")),
-            "video_count": safe_int(author_stats.get("videoCount")),
-            "like_count": safe_int(stats.get("diggCount")),
-            "comment_count": safe_int(stats.get("commentCount")),
-            "play_count": safe_int(stats.get("playCount")),
-            "collect_count": safe_int(stats_v2.get("collectCount") or stats.get("collectCount")),
-            "share_count": safe_int(stats.get("shareCount")),
-            "repost_count": safe_int(stats_v2.get("repostCount") or stats.get("repostCount")),
-            "scraped_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-    except Exception as e:
-        return {"video_url": url, "error": str(e)}
+@st.cache_resource(show_spinner=False)
+def get_history():
+    return StatHistory()
+
+
+# --- LIVE VIEW ---
+# Jobs record their progress on the session manager's thread; the script
+# thread repaints from it at UI_REFRESH_HZ however fast records complete, and
+# a placeholder only gets a new message when its content actually changed.
+# The one exception is the heartbeat: Streamlit only acts on a rerun (a click
+# on Cancel, any widget) when the script sends something, so every poll sends
+# the elapsed time, even while the job sits queued and nothing else changes.
+class LiveView:
+    def __init__(self):
+        self._painted = {}
+
+    def paint(self, area, html):
+        if self._painted.get(id(area)) != html:
+            self._painted[id(area)] = html
+            area.markdown(html, unsafe_allow_html=True)
+
+    def paint_progress(self, bar, value):
+        value = round(min(value, 1.0), 3)
+        if self._painted.get(id(bar)) != value:
+            self._painted[id(bar)] = value
+            bar.progress(value)
+
+    def beat(self, area, text):
+        area.caption(text)
+
+    def paint_logs(self, area, lines):
+        self.paint(area, '<div class="log-container">' + "<br>".join(lines) + '</div>')
+
+
+def telemetry_html(telemetry):
+    snap = telemetry.snapshot()
+    cells = [("Throughput", f"{snap['throughput_per_min']:.0f}/min")]
+    for op, label in (("video_info", "video.info"), ("creator_feed", "creator feed")):
+        lat = snap["latency"].get(op)
+        if lat:
+            cells.append((f"{label} p50 / p95 / p99", f"{lat['p50']}s / {lat['p95']}s / {lat['p99']}s"))
+    errors = " · ".join(f"{k} {v:.0%}" for k, v in snap["error_rate"].items()) or "none"
+    cells.append(("Errors (last min)", errors))
+    if snap["oldest_in_flight_s"]:
+        cells.append(("Oldest in flight", f"{snap['oldest_in_flight_s']:.1f}s"))
+    return (
+        '<div style="display:flex; gap:2rem; flex-wrap:wrap; margin-top:0.8rem;">' +
+        "".join(
+            f'<div><div class="metric-label">{k}</div>'
+            f'<div style="font-size:0.9rem; color:#F0F0F5;">{v}</div></div>'
+            for k, v in cells
+        ) +
+        '</div>'
+    )
 
 
-async def run_scraper(video_urls, ms_token, progress_bar, status_text, log_area):
-    results, failed = [], []
-    logs = []
+def status_html(job, runner):
+    if job.status == QUEUED:
+        return f'<div class="metric-label">Queued · {runner.queued_ahead(job)} job(s) ahead, one batch each</div>'
+    rate = f"{job.limiter.rate:.2f} req/s"
+    if job.kind == CREATOR_JOB:
+        line = f"Creators {job.done} of {job.total} · {job.videos} videos · {rate}"
+        detail = job.outcome_summary()
+    else:
+        cache_hits = job.cache.hits if job.cache else 0
+        line = f"Processed {job.skipped + job.done} of {job.total} · {cache_hits} cached · {job.retries.pending} awaiting retry · {rate}"
+        short_url = job.last_url[:60] + "..." if len(job.last_url) > 60 else job.last_url
+        detail = f"{job.outcome_summary()} · {short_url}"
+    return (
+        f'<div class="metric-label">{line}</div>'
+        f'<div style="font-size:0.85rem; color:#8888AA; margin-top:0.2rem;">{detail}</div>'
+    )
 
-    async with TikTokApi() as api:
-        await api.create_sessions(
-            ms_tokens=[ms_token], num_sessions=1,
-            sleep_after=3, browser="chromium"
-        )
 
-        for idx, url in enumerate(video_urls):
-            short_url = url[:60] + "..." if len(url) > 60 else url
-            status_text.markdown(
-                f'<div class="metric-label">Processing {idx+1} of {len(video_urls)}</div>'
-                f'<div style="font-size:0.85rem; color:#8888AA; margin-top:0.2rem;">{short_url}</div>',
-                unsafe_allow_html=True
-            )
+def watch_job(job, runner):
+    # Blocks this script run until the job finishes; a rerun only stops the
+    # watching, the job itself carries on in the runner
+    prog_col, status_col = st.columns([2, 3])
+    with prog_col:
+        progress_bar = st.progress(0)
+    with status_col:
+        status_text = st.empty()
+    log_area = st.empty()
+    telemetry_area = st.empty()
+    heartbeat = st.empty()
+    view = LiveView()
+
+    while True:
+        finished = job.is_finished
+        since = job.started or job.created
+        elapsed = time.strftime("%H:%M:%S", time.gmtime(time.time() - since))
+        view.beat(heartbeat, f"{'Running' if job.started else 'Queued'} for {elapsed}")
+        view.paint(status_text, status_html(job, runner))
+        view.paint_logs(log_area, job.logs())
+        view.paint_progress(progress_bar, job.progress)
+        view.paint(telemetry_area, telemetry_html(job.telemetry))
+        if finished:
+            return
+        time.sleep(1 / UI_REFRESH_HZ)
+
+
+def render_results(job):
+    fail = job.failed
+    fail_label = "creators" if job.kind == CREATOR_JOB else "URLs"
+    st.markdown("<br>", unsafe_allow_html=True)
 
-            data = await get_video_info(url, api)
+    # Results summary
+    r1, r2, r3, r4 = st.columns(4)
+    with r1:
+        st.markdown(f"""
+            <div class="metric-card">
+                <div class="metric-icon" style="color:#00F595;">✓</div>
+                <div class="metric-label">Successful</div>
+                <div class="metric-value" style="color:#00F595;">{job.ok_count}</div>
+            </div>""", unsafe_allow_html=True)
+    with r2:
+        st.markdown(f"""
+            <div class="metric-card">
+                <div class="metric-icon" style="color:#FF2D55;">✗</div>
+                <div class="metric-label">Failed</div>
+                <div class="metric-value" style="color:#FF2D55;">{len(fail)}</div>
+            </div>""", unsafe_allow_html=True)
+    with r3:
+        rate = round(job.ok_count / (job.ok_count + len(fail)) * 100) if job.ok_count or fail else 0
+        st.markdown(f"""
+            <div class="metric-card">
+                <div class="metric-icon">📈</div>
+                <div class="metric-label">Success Rate</div>
+                <div class="metric-value">{rate}%</div>
+            </div>""", unsafe_allow_html=True)
+    with r4:
+        hits = job.cache.hits if job.cache else 0
+        misses = job.cache.misses if job.cache else job.total
+        st.markdown(f"""
+            <div class="metric-card">
+                <div class="metric-icon">💾</div>
+                <div class="metric-label">Cache Hits / Misses</div>
+                <div class="metric-value">{hits} / {misses}</div>
+            </div>""", unsafe_allow_html=True)
 
-            if "error" in data:
-                failed.append(data)
-                logs.append(f"✗ [{idx+1}] FAILED — {data.get('error', 'Unknown error')}")
-            else:
-                results.append(data)
-                logs.append(f"✓ [{idx+1}] OK — @{data.get('unique_id', '?')} · {format_number(data.get('play_count', 0))} plays")
+    st.markdown("<br>", unsafe_allow_html=True)
 
-            log_area.markdown(
-                '<div class="log-container">' +
-                "<br>".join(logs[-10:]) +
-                '</div>',
-                unsafe_allow_html=True
-            )
-            progress_bar.progress((idx + 1) / len(video_urls))
-            await asyncio.sleep(2)
+    # The workbook was streamed to disk during the run. Exports are purged a
+    # day after they were written (export.purge_old_exports), so an old job
+    # can outlive its file
+    dl_col, _ = st.columns([1, 3])
+    with dl_col:
+        if job.output and os.path.exists(job.output):
+            with open(job.output, "rb") as xlsx_file:
+                st.download_button(
+                    "📥 Download Results (.xlsx)",
+                    data=xlsx_file,
+                    file_name=f"tiktok_results_{datetime.fromtimestamp(job.created).strftime('%Y%m%d_%H%M')}_{job.id}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    use_container_width=True
+                )
+        else:
+            st.warning("⌛ The results file has expired. Run the batch again to download it.")
 
-    return results, failed
+    if len(job.preview):
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.markdown('<div class="section-title">📊 Results Preview</div>', unsafe_allow_html=True)
+
+        df_res = pd.DataFrame(job.preview)
+        display_cols = [
+            "unique_id", "nickname", "play_count", "like_count",
+            "comment_count", "share_count", "follower_count", "hashtags", "create_time"
+        ]
+        available_cols = [c for c in display_cols if c in df_res.columns]
+
+        st.dataframe(
+            df_res[available_cols],
+            use_container_width=True,
+            hide_index=True,
+            height=400
+        )
+        if job.ok_count > len(job.preview):
+            st.caption(f"Showing the first {len(job.preview)} of {job.ok_count} rows. The download has them all.")
+
+    if fail:
+        with st.expander(f"⚠️ View {len(fail)} failed {fail_label}"):
+            by_type = pd.Series([f.get("error_type", "unknown") for f in fail]).value_counts()
+            st.caption(" · ".join(f"{t}: {n}" for t, n in by_type.items()))
+            st.dataframe(pd.DataFrame(fail), use_container_width=True, hide_index=True)
+
+    with st.expander("🔑 Token health"):
+        st.dataframe(pd.DataFrame(job.token_pool.stats()), use_container_width=True, hide_index=True)
+
+    telemetry = job.telemetry
+    with st.expander("📡 Telemetry"):
+        st.json(telemetry.snapshot())
+        j_col, p_col, _ = st.columns([1, 1, 2])
+        with j_col:
+            st.download_button("Export JSON", telemetry.to_json(), file_name=f"scrape_metrics_{job.id}.json",
+                               mime="application/json", use_container_width=True)
+        with p_col:
+            st.download_button("Export Prometheus", telemetry.to_prometheus(), file_name=f"scrape_metrics_{job.id}.prom",
+                               mime="text/plain", use_container_width=True)
 
 
 # ==================== UI ====================
@@ -484,18 +602,41 @@ with st.sidebar:
     """, unsafe_allow_html=True)
 
     st.markdown('<div class="metric-label">Authentication</div>', unsafe_allow_html=True)
-    token = st.text_input(
-        "MS Token",
-        type="password",
+    token_text = st.text_area(
+        "MS Tokens",
         value="hu02L0FHNzvsCOzu44TKmOLTeRdHzhKw7ezMAu_Rz_fs2zjXGDzxd8NHd50pKOU5CDYRP3NAa-6Frha4XeU4hiM1yKpuJv5KvHRB1n6JuPPZ2thX5b94E4A-iT6avWkzgrn73ku_9xy9UbaUNbSED8d7y3M=",
+        placeholder="One msToken per line",
+        height=100,
         label_visibility="collapsed"
     )
+    token_file = st.file_uploader("Token file (.txt)", type=["txt"])
+    if token_file:
+        token_text += "\n" + token_file.getvalue().decode("utf-8", errors="ignore")
+    tokens = parse_tokens(token_text)
 
-    if token:
-        st.markdown('<div class="status-badge">● Token Active</div>', unsafe_allow_html=True)
+    if tokens:
+        st.markdown(f'<div class="status-badge">● {len(tokens)} Token(s) Active</div>', unsafe_allow_html=True)
     else:
         st.warning("Enter your MS Token to continue")
 
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown('<div class="metric-label">Concurrency</div>', unsafe_allow_html=True)
+    num_sessions = st.slider("Browser sessions", min_value=1, max_value=MAX_SESSIONS, value=min(2, MAX_SESSIONS))
+    per_session = st.slider("In-flight per session", min_value=1, max_value=MAX_PER_SESSION, value=min(2, MAX_PER_SESSION))
+    max_rate = st.slider("Max requests / sec", min_value=0.5, max_value=MAX_RATE, value=min(3.0, MAX_RATE), step=0.5)
+    runner = get_job_runner()
+    st.caption(f"{runner.sessions.warm_sessions()} warm browser session(s) ready · jobs share one browser and run in turn"
+               f" · {runner.pages.hits} videos fetched without it")
+
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown('<div class="metric-label">Result Cache</div>', unsafe_allow_html=True)
+    use_cache = st.checkbox("Serve fresh results from cache", value=True)
+    cache_ttl_hours = st.number_input("Freshness (hours)", min_value=0.0, value=6.0, step=1.0)
+
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown('<div class="metric-label">Checkpoint</div>', unsafe_allow_html=True)
+    resume_jobs = st.checkbox("Resume interrupted jobs", value=True)
+
     st.markdown("<br>", unsafe_allow_html=True)
     st.markdown('<div class="metric-label">How to get MS Token</div>', unsafe_allow_html=True)
     with st.expander("Step-by-step guide"):
@@ -506,14 +647,21 @@ with st.sidebar:
         4. Go to **Cookies** → `tiktok.com`
         5. Find the cookie named `msToken`
         6. Copy its value and paste above
+
+        Add several tokens, one per line, to spread sessions across them.
+        A token that keeps failing is retired and its session moved to a
+        healthy one mid-run.
         """)
 
     st.markdown("<br>", unsafe_allow_html=True)
     st.markdown('<div class="metric-label">Requirements</div>', unsafe_allow_html=True)
-    st.info("Upload an Excel file with a **`video_url`** column containing TikTok URLs.")
+    st.info("Upload an Excel, CSV or Parquet file with a **`video_url`** column containing TikTok URLs, "
+            "or switch to **Creators** and paste `unique_id`s.")
 
 
 # --- MAIN CONTENT ---
+# Identifies this browser session's jobs in the shared job table
+owner = st.session_state.setdefault("owner", uuid.uuid4().hex[:8])
 
 # Header
 st.markdown("""
@@ -525,15 +673,41 @@ st.markdown("""
 
 
 # Upload Section
+mode = st.radio(
+    "Input mode", [URL_MODE, CREATOR_MODE, TRACK_MODE],
+    horizontal=True, label_visibility="collapsed"
+)
 col_upload, col_preview = st.columns([1.2, 1], gap="large")
 
 with col_upload:
-    st.markdown('<div class="section-title">📂 Upload Input File</div>', unsafe_allow_html=True)
-    uploaded_file = st.file_uploader(
-        "Drop your Excel file here",
-        type=["xlsx"],
-        label_visibility="collapsed"
-    )
+    if mode == CREATOR_MODE:
+        st.markdown('<div class="section-title">👤 Creators</div>', unsafe_allow_html=True)
+        creator_text = st.text_area(
+            "Creator handles",
+            placeholder="One unique_id per line, e.g. @username",
+            height=120,
+            label_visibility="collapsed"
+        )
+        creator_file = st.file_uploader(
+            "Or a file with a unique_id column",
+            type=SUPPORTED_TYPES
+        )
+        max_videos = st.number_input("Recent videos per creator", min_value=1, max_value=500, value=30)
+        uploaded_file = None
+    elif mode == TRACK_MODE:
+        st.markdown('<div class="section-title">📈 Tracking</div>', unsafe_allow_html=True)
+        st.caption("Videos scraped with tracking on are re-scraped on a schedule: every 6h while "
+                   "they are new or growing fast, daily while growing, weekly once quiet.")
+        daily_budget = st.number_input("Daily request budget", min_value=1, value=5000, step=500)
+        uploaded_file = None
+    else:
+        st.markdown('<div class="section-title">📂 Upload Input File</div>', unsafe_allow_html=True)
+        uploaded_file = st.file_uploader(
+            "Drop your Excel, CSV, Parquet or text file here",
+            type=SUPPORTED_TYPES,
+            label_visibility="collapsed"
+        )
+        track_videos = st.checkbox("📈 Track these videos over time", value=False)
 
 with col_preview:
     st.markdown('<div class="section-title">📋 What we extract</div>', unsafe_allow_html=True)
@@ -551,16 +725,170 @@ with col_preview:
     """, unsafe_allow_html=True)
 
 
-# File Loaded State
-if uploaded_file:
+# Creator Mode
+if mode == CREATOR_MODE:
     try:
-        df_in = pd.read_excel(uploaded_file)
+        handles = creator_text.split()
+        if creator_file:
+            try:
+                handles += read_column(creator_file, "unique_id")
+            except ColumnNotFound:
+                st.error("❌ Column `unique_id` not found in your file. Please check the column name.")
+                st.stop()
+        creators = engine.normalize_unique_ids(handles)
+    except Exception as e:
+        st.error(f"Error reading file: {str(e)}")
+        st.stop()
+
+    if creators:
+        st.markdown("<br>", unsafe_allow_html=True)
 
-        if "video_url" not in df_in.columns:
-            st.error("❌ Column `video_url` not found in your Excel file. Please check the column name.")
+        m1, m2, m3, m4 = st.columns(4)
+        with m1:
+            st.markdown(f"""
+                <div class="metric-card">
+                    <div class="metric-icon">👤</div>
+                    <div class="metric-label">Creators</div>
+                    <div class="metric-value">{len(creators)}</div>
+                </div>""", unsafe_allow_html=True)
+        with m2:
+            st.markdown(f"""
+                <div class="metric-card">
+                    <div class="metric-icon">🎬</div>
+                    <div class="metric-label">Max Videos</div>
+                    <div class="metric-value">{len(creators) * max_videos}</div>
+                </div>""", unsafe_allow_html=True)
+        with m3:
+            # One profile call plus one call per feed page of 30, per creator
+            n_requests = len(creators) * (1 + -(-max_videos // 30))
+            est_minutes = round(max(n_requests * 3 / (num_sessions * per_session), n_requests / max_rate) / 60, 1)
+            st.markdown(f"""
+                <div class="metric-card">
+                    <div class="metric-icon">⏱️</div>
+                    <div class="metric-label">Est. Time</div>
+                    <div class="metric-value">{est_minutes}m</div>
+                </div>""", unsafe_allow_html=True)
+        with m4:
+            st.markdown(f"""
+                <div class="metric-card">
+                    <div class="metric-icon">📤</div>
+                    <div class="metric-label">Output Cols</div>
+                    <div class="metric-value">21</div>
+                </div>""", unsafe_allow_html=True)
+
+        st.markdown("<br>", unsafe_allow_html=True)
+
+        btn_col, hint_col = st.columns([1, 3])
+        with btn_col:
+            start = st.button("🚀 Start Scraping", use_container_width=True)
+        with hint_col:
+            st.markdown(
+                '<div style="padding-top:0.7rem; font-size:0.8rem; color:#8888AA;">'
+                f'Will page through up to {max_videos} recent videos for each of {len(creators)} creators, ~{n_requests} requests in total'
+                '</div>',
+                unsafe_allow_html=True
+            )
+
+        if start:
+            if not tokens:
+                st.error("⛔ Please enter your MS Token in the sidebar before scraping.")
+                st.stop()
+
+            job = get_job_runner().submit_creators(
+                creators, tokens, f"{len(creators)} creators", num_sessions=num_sessions,
+                per_session=per_session, max_rate=max_rate, max_videos=max_videos,
+                cache_ttl=cache_ttl_hours * 3600 if use_cache else None, owner=owner
+            )
+            st.session_state["job_id"] = job.id
+    else:
+        st.markdown("""
+            <div style="text-align:center; padding:3rem 0; color:#8888AA;">
+                <div style="font-size:3rem; margin-bottom:1rem; opacity:0.4;">👤</div>
+                <div style="font-size:0.9rem;">Paste creator handles to get started</div>
+                <div style="font-size:0.78rem; margin-top:0.4rem; opacity:0.7;">Or upload an .xlsx with a <code>unique_id</code> column</div>
+            </div>
+        """, unsafe_allow_html=True)
+
+# Tracking Mode
+elif mode == TRACK_MODE:
+    history = get_history()
+    summary = history.summary()
+    due = history.due(daily_budget)
+    st.markdown("<br>", unsafe_allow_html=True)
+
+    m1, m2, m3, m4 = st.columns(4)
+    for col, icon, label, value in (
+        (m1, "📈", "Tracked Videos", summary["active"]),
+        (m2, "⏰", "Due Now", summary["due"]),
+        (m3, "🗂️", "Snapshots", summary["snapshots"]),
+        (m4, "🎯", "Budget Used Today", f"{summary['used_today']} / {daily_budget}"),
+    ):
+        with col:
+            st.markdown(f"""
+                <div class="metric-card">
+                    <div class="metric-icon">{icon}</div>
+                    <div class="metric-label">{label}</div>
+                    <div class="metric-value">{value}</div>
+                </div>""", unsafe_allow_html=True)
+
+    st.markdown("<br>", unsafe_allow_html=True)
+    btn_col, hint_col = st.columns([1, 3])
+    with btn_col:
+        start = st.button("🔄 Refresh Due Videos", use_container_width=True, disabled=not due)
+    with hint_col:
+        st.markdown(
+            '<div style="padding-top:0.7rem; font-size:0.8rem; color:#8888AA;">'
+            f'{len(due)} of {summary["due"]} due videos fit in what is left of today\'s budget, fastest growing first'
+            '</div>',
+            unsafe_allow_html=True
+        )
+
+    if start:
+        if not tokens:
+            st.error("⛔ Please enter your MS Token in the sidebar before scraping.")
             st.stop()
+        # Refreshes always go to TikTok; a cached record would be a stale snapshot
+        job = get_job_runner().submit_urls(
+            UrlPlan(due), tokens, f"Tracking refresh ({len(due)} videos)", num_sessions=num_sessions,
+            per_session=per_session, max_rate=max_rate, history=history, owner=owner
+        )
+        st.session_state["job_id"] = job.id
 
-        urls = df_in["video_url"].dropna().tolist()
+    report = history.report()
+    if report:
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.markdown('<div class="section-title">📊 Growth</div>', unsafe_allow_html=True)
+        df_growth = pd.DataFrame(report)
+        st.dataframe(df_growth[GROWTH_COLS], use_container_width=True, hide_index=True, height=400)
+        dl_col, _ = st.columns([1, 3])
+        with dl_col:
+            st.download_button(
+                "📥 Download Growth (.csv)",
+                data=df_growth.to_csv(index=False).encode("utf-8"),
+                file_name=f"tiktok_growth_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
+                mime="text/csv",
+                use_container_width=True
+            )
+    else:
+        st.markdown("""
+            <div style="text-align:center; padding:3rem 0; color:#8888AA;">
+                <div style="font-size:3rem; margin-bottom:1rem; opacity:0.4;">📈</div>
+                <div style="font-size:0.9rem;">No videos tracked yet</div>
+                <div style="font-size:0.78rem; margin-top:0.4rem; opacity:0.7;">Scrape a sheet in Video URLs mode with tracking on</div>
+            </div>
+        """, unsafe_allow_html=True)
+
+# File Loaded State
+elif uploaded_file:
+    try:
+        try:
+            urls = read_column(uploaded_file, "video_url")
+        except ColumnNotFound:
+            st.error("❌ Column `video_url` not found in your file. Please check the column name.")
+            st.stop()
+
+        plan = UrlPlan(urls)
+        job_id = job_id_for(plan.rows)
 
         st.markdown("<br>", unsafe_allow_html=True)
 
@@ -571,20 +899,21 @@ if uploaded_file:
             st.markdown(f"""
                 <div class="metric-card">
                     <div class="metric-icon">📋</div>
-                    <div class="metric-label">Total URLs</div>
-                    <div class="metric-value">{len(urls)}</div>
+                    <div class="metric-label">Unique / Total URLs</div>
+                    <div class="metric-value">{len(plan.fetch_urls)} / {len(urls)}</div>
                 </div>""", unsafe_allow_html=True)
 
         with m2:
             st.markdown(f"""
                 <div class="metric-card">
-                    <div class="metric-icon">📊</div>
-                    <div class="metric-label">Total Rows</div>
-                    <div class="metric-value">{len(df_in)}</div>
+                    <div class="metric-icon">🔗</div>
+                    <div class="metric-label">Short Links</div>
+                    <div class="metric-value">{len(plan.short_links)}</div>
                 </div>""", unsafe_allow_html=True)
 
         with m3:
-            est_minutes = round(len(urls) * 5 / 60, 1)
+            n_fetch = len(plan.fetch_urls)
+            est_minutes = round(max(n_fetch * 3 / (num_sessions * per_session), n_fetch / max_rate) / 60, 1)
             st.markdown(f"""
                 <div class="metric-card">
                     <div class="metric-icon">⏱️</div>
@@ -605,7 +934,7 @@ if uploaded_file:
         # Preview toggle
         with st.expander("👁️ Preview uploaded URLs"):
             st.dataframe(
-                df_in[["video_url"]].head(20),
+                pd.DataFrame({"video_url": urls[:20]}),
                 use_container_width=True,
                 hide_index=True
             )
@@ -619,99 +948,25 @@ if uploaded_file:
         with hint_col:
             st.markdown(
                 '<div style="padding-top:0.7rem; font-size:0.8rem; color:#8888AA;">'
-                f'Will process {len(urls)} videos with ~2s delay between requests'
+                f'Will fetch {len(plan.fetch_urls)} unique videos ({len(plan.short_links)} short links to resolve) across {num_sessions} session(s) × {per_session} in flight, adaptive rate up to {max_rate:g} req/s · job <code>{job_id}</code>'
                 '</div>',
                 unsafe_allow_html=True
             )
 
         # --- SCRAPING ENGINE ---
         if start:
-            if not token:
+            if not tokens:
                 st.error("⛔ Please enter your MS Token in the sidebar before scraping.")
                 st.stop()
 
-            st.markdown("<hr>", unsafe_allow_html=True)
-            st.markdown('<div class="section-title">⚡ Live Progress</div>', unsafe_allow_html=True)
-
-            prog_col, status_col = st.columns([2, 3])
-            with prog_col:
-                progress_bar = st.progress(0)
-            with status_col:
-                status_text = st.empty()
-
-            log_area = st.empty()
-
-            with st.spinner(""):
-                res, fail = asyncio.run(run_scraper(urls, token, progress_bar, status_text, log_area))
-
-            st.markdown("<br>", unsafe_allow_html=True)
-
-            # Results summary
-            r1, r2, r3 = st.columns(3)
-            with r1:
-                st.markdown(f"""
-                    <div class="metric-card">
-                        <div class="metric-icon" style="color:#00F595;">✓</div>
-                        <div class="metric-label">Successful</div>
-                        <div class="metric-value" style="color:#00F595;">{len(res)}</div>
-                    </div>""", unsafe_allow_html=True)
-            with r2:
-                st.markdown(f"""
-                    <div class="metric-card">
-                        <div class="metric-icon" style="color:#FF2D55;">✗</div>
-                        <div class="metric-label">Failed</div>
-                        <div class="metric-value" style="color:#FF2D55;">{len(fail)}</div>
-                    </div>""", unsafe_allow_html=True)
-            with r3:
-                rate = round(len(res) / len(urls) * 100) if urls else 0
-                st.markdown(f"""
-                    <div class="metric-card">
-                        <div class="metric-icon">📈</div>
-                        <div class="metric-label">Success Rate</div>
-                        <div class="metric-value">{rate}%</div>
-                    </div>""", unsafe_allow_html=True)
-
-            # Build Excel
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                if res:
-                    pd.DataFrame(res).to_excel(writer, index=False, sheet_name="✅ Success")
-                if fail:
-                    pd.DataFrame(fail).to_excel(writer, index=False, sheet_name="❌ Failed")
-
-            st.markdown("<br>", unsafe_allow_html=True)
-
-            dl_col, _ = st.columns([1, 3])
-            with dl_col:
-                st.download_button(
-                    "📥 Download Results (.xlsx)",
-                    data=output.getvalue(),
-                    file_name=f"tiktok_results_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    use_container_width=True
-                )
-
-            if res:
-                st.markdown("<br>", unsafe_allow_html=True)
-                st.markdown('<div class="section-title">📊 Results Preview</div>', unsafe_allow_html=True)
-
-                df_res = pd.DataFrame(res)
-                display_cols = [
-                    "unique_id", "nickname", "play_count", "like_count",
-                    "comment_count", "share_count", "follower_count", "hashtags", "create_time"
-                ]
-                available_cols = [c for c in display_cols if c in df_res.columns]
-
-                st.dataframe(
-                    df_res[available_cols],
-                    use_container_width=True,
-                    hide_index=True,
-                    height=400
-                )
-
-            if fail:
-                with st.expander(f"⚠️ View {len(fail)} failed URLs"):
-                    st.dataframe(pd.DataFrame(fail), use_container_width=True, hide_index=True)
+            job = get_job_runner().submit_urls(
+                plan, tokens, uploaded_file.name, num_sessions=num_sessions,
+                per_session=per_session, max_rate=max_rate,
+                cache_ttl=cache_ttl_hours * 3600 if use_cache else None,
+                job_key=job_id, resume=resume_jobs,
+                history=get_history() if track_videos else None, owner=owner
+            )
+            st.session_state["job_id"] = job.id
 
     except Exception as e:
         st.error(f"Error reading file: {str(e)}")
@@ -721,11 +976,50 @@ else:
     st.markdown("""
         <div style="text-align:center; padding:3rem 0; color:#8888AA;">
             <div style="font-size:3rem; margin-bottom:1rem; opacity:0.4;">📂</div>
-            <div style="font-size:0.9rem;">Upload an Excel file to get started</div>
-            <div style="font-size:0.78rem; margin-top:0.4rem; opacity:0.7;">Supported format: .xlsx with a <code>video_url</code> column</div>
+            <div style="font-size:0.9rem;">Upload an Excel, CSV, Parquet or text file to get started</div>
+            <div style="font-size:0.78rem; margin-top:0.4rem; opacity:0.7;">Supported formats: .xlsx, .csv or .parquet with a <code>video_url</code> column, or .txt with one URL per line</div>
         </div>
     """, unsafe_allow_html=True)
 
+# --- JOBS ---
+# Every job on this server, whoever started it. Jobs keep running across
+# reruns and closed tabs; pick one to watch it or download its results.
+runner = get_job_runner()
+all_jobs = runner.list()
+if all_jobs:
+    st.markdown("<hr>", unsafe_allow_html=True)
+    st.markdown('<div class="section-title">🗂️ Jobs</div>', unsafe_allow_html=True)
+    st.dataframe(pd.DataFrame([j.summary() for j in all_jobs]), use_container_width=True, hide_index=True)
+
+    job_ids = [j.id for j in all_jobs]
+    mine = [j.id for j in all_jobs if j.owner == owner]
+    current = st.session_state.get("job_id")
+    default = current if current in job_ids else (mine[0] if mine else job_ids[0])
+    pick_col, cancel_col = st.columns([3, 1])
+    with pick_col:
+        selected = st.selectbox(
+            "Job", job_ids, index=job_ids.index(default),
+            format_func=lambda i: f"{i} · {runner.get(i).label} · {runner.get(i).status}",
+            label_visibility="collapsed"
+        )
+    st.session_state["job_id"] = selected
+    job = runner.get(selected)
+
+    if not job.is_finished:
+        with cancel_col:
+            if st.button("✋ Cancel job", use_container_width=True):
+                runner.cancel(job.id)
+        st.markdown('<div class="section-title">⚡ Live Progress</div>', unsafe_allow_html=True)
+        watch_job(job, runner)
+        st.rerun()
+
+    if job.status == DONE:
+        render_results(job)
+    elif job.status == FAILED:
+        st.error(f"Job {job.id} failed: {job.error}")
+    else:
+        st.warning(f"Job {job.id} was cancelled.")
+
 # --- CONFIGURATION ---
 logging.getLogger("TikTokApi.tiktok").setLevel(logging.CRITICAL)
 logging.getLogger("streamlit.runtime.scriptrunner_utils").setLevel(logging.CRITICAL)  # ← add this
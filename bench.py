@@ -0,0 +1,266 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import engine
+from cache import ResultCache
+from cli import RecordWriter
+from fake_tiktok import FakePageServer, FakeServer, FakeTikTokApi
+from journal import Journal
+from ratelimit import AdaptiveRateLimiter
+from retry import RetryQueue
+from telemetry import Telemetry
+from tokens import TokenPool
+from urls import UrlPlan
+from webfetch import PageFetcher
+
+# Offline benchmark: runs the real pipeline (UrlPlan, run_scraper, limiter,
+# retries, cache, journal and export) against fake_tiktok's stand-in server
+# and reports throughput, latency percentiles and peak RSS. Each result is
+# appended to --results together with the commit and parameters, and
+# compared with the last run of the same scenario on another commit.
+#
+#   python bench.py --urls 1000 10000 100000
+#   python bench.py --urls 10000 --latency-median 0.01 --format xlsx --cache
+#   python bench.py --urls 10000 --http --wall-rate 0.1    # HTTP fast path first
+#
+# Every size runs in its own process so peak RSS is not carried over.
+
+SCENARIO_KEYS = (
+    "urls", "dup_rate", "sessions", "per_session", "max_rate", "start_rate", "latency_median",
+    "latency_sigma", "not_found_rate", "transient_rate", "parse_rate", "server_rate",
+    "retry_base", "format", "cache", "journal", "seed",
+)
+
+# Where the limiter's steady rate should sit against --server-rate: AIMD
+# saws between half the server's rate and just over it
+STEADY_RATE_RANGE = (0.6, 1.2)
+
+
+def make_rows(n, dup_rate, rng):
+    # Canonical URLs plus some repeats carrying tracking queries, the mix a
+    # campaign sheet usually has
+    rows = []
+    for i in range(n):
+        if rows and rng.random() < dup_rate:
+            rows.append(rng.choice(rows) + "?is_from_webapp=1&sender_device=pc")
+        else:
+            rows.append(f"https://www.tiktok.com/@creator{i % 5000}/video/{7_300_000_000_000_000_000 + i}")
+    return rows
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere
+    return round(rss / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD", "--", "*.py"],
+                               cwd=os.path.dirname(os.path.abspath(__file__))).returncode
+        return out.stdout.strip() + ("-dirty" if dirty else "") if out.returncode == 0 else None
+    except OSError:
+        return None
+
+
+async def run_once(args, workdir):
+    rng = random.Random(args.seed)
+    server = FakeServer(
+        latency_median=args.latency_median, latency_sigma=args.latency_sigma,
+        not_found_rate=args.not_found_rate, transient_rate=args.transient_rate,
+        parse_rate=args.parse_rate, server_rate=args.server_rate,
+        session_latency=args.session_latency, seed=args.seed,
+    )
+    api = FakeTikTokApi(server)
+    page_server = pages = None
+    if args.http:
+        page_server = FakePageServer(server, wall_rate=args.wall_rate)
+        pages = PageFetcher(base_url=await page_server.start(), concurrency=args.sessions * args.per_session)
+    plan = UrlPlan(make_rows(args.urls, args.dup_rate, rng))
+    rows_for = plan.rows_by_fetch()
+
+    cache = ResultCache(os.path.join(workdir, "cache.sqlite3")) if args.cache else None
+    journal = Journal("bench", directory=workdir) if args.journal else None
+    limiter = AdaptiveRateLimiter(rate=args.start_rate or args.max_rate, max_rate=args.max_rate)
+    retries = RetryQueue(base=args.retry_base)
+    telemetry = Telemetry()
+    writer = RecordWriter(os.path.join(workdir, f"out.{args.format}"), args.format)
+    tokens = [f"bench-token-{i}" for i in range(args.sessions)]
+    written = set()
+
+    def emit(i, data):
+        for row in rows_for.get(i, []):
+            writer.write({**data, "video_url": plan.rows[row]})
+        written.add(i)
+
+    # The limiter's rate once a second; the second half of the run is its
+    # steady state, checked against --server-rate in report()
+    rates = []
+
+    async def sample_rate():
+        while True:
+            rates.append(limiter.rate)
+            await asyncio.sleep(1)
+
+    sampler = asyncio.create_task(sample_rate())
+    started = time.perf_counter()
+    async with api:
+        records = await engine.run_scraper(
+            plan.fetch_urls, TokenPool(tokens), num_sessions=args.sessions,
+            per_session=args.per_session, limiter=limiter, cache=cache, journal=journal,
+            on_record=emit, api=api, retries=retries, telemetry=telemetry, pages=pages,
+        )
+    sampler.cancel()
+    if pages:
+        await pages.close()
+        await page_server.close()
+    for i in records.indices():
+        if i not in written:
+            emit(i, records[i])
+    export_started = time.perf_counter()
+    with telemetry.timer("export"):
+        writer.close()
+    finished = time.perf_counter()
+    if cache:
+        cache.close()
+
+    ok, failed = records.count(plan.row_to_fetch)
+    snap = telemetry.snapshot()
+    latency = snap["latency"].get("video_page" if args.http else "video_info", {})
+    elapsed = finished - started
+    return {
+        "rows": len(plan.rows),
+        "fetched": len(plan.fetch_urls),
+        "ok": ok,
+        "failed": failed,
+        "elapsed_s": round(elapsed, 3),
+        "export_s": round(finished - export_started, 3),
+        "throughput_per_s": round(len(plan.fetch_urls) / elapsed, 1),
+        "latency_mean_s": latency.get("mean"),
+        "latency_p50_s": latency.get("p50"),
+        "latency_p99_s": latency.get("p99"),
+        "requests": server.requests,
+        "throttled": server.throttled,
+        "retried": retries.retried,
+        "final_rate": round(limiter.rate, 2),
+        "steady_rate": round(sum(rates[len(rates) // 2:]) / len(rates[len(rates) // 2:]), 2) if rates else None,
+        "over_http": pages.hits if pages else 0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def previous_run(path, scenario, commit):
+    if not os.path.exists(path): return None
+    last = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("scenario") == scenario and entry.get("commit") != commit:
+                last = entry
+    return last
+
+
+def report(entry, previous):
+    # Prints the run; False when the limiter missed its steady-rate target
+    r = entry["result"]
+    on_target = True
+    print(f"{r['rows']} rows / {r['fetched']} videos on {entry['commit'] or 'unknown commit'}: "
+          f"{r['throughput_per_s']}/s, p50 {r['latency_p50_s']}s, p99 {r['latency_p99_s']}s, "
+          f"peak RSS {r['peak_rss_mb']} MB, export {r['export_s']}s "
+          f"({r['ok']} ok, {r['failed']} failed, {r['retried']} retries, {r['throttled']} throttled"
+          f"{', %d over HTTP' % r['over_http'] if r.get('over_http') else ''})")
+    server_rate = entry["scenario"].get("server_rate")
+    if server_rate and r.get("steady_rate") is not None:
+        share = r["steady_rate"] / server_rate
+        on_target = STEADY_RATE_RANGE[0] <= share <= STEADY_RATE_RANGE[1]
+        print(f"  steady limiter rate {r['steady_rate']} req/s, {share:.0%} of --server-rate"
+              f" ({'ok' if on_target else 'OFF TARGET'})")
+    if previous:
+        p = previous["result"]
+        deltas = []
+        for key, label in (("throughput_per_s", "throughput"), ("latency_p99_s", "p99"),
+                           ("peak_rss_mb", "peak RSS"), ("export_s", "export")):
+            if p.get(key) and r.get(key) is not None:
+                deltas.append(f"{label} {(r[key] - p[key]) / p[key]:+.1%}")
+        print(f"  vs {previous['commit']}: " + ", ".join(deltas))
+    return on_target
+
+
+def run_single(args):
+    scenario = {k: getattr(args, k) for k in SCENARIO_KEYS}
+    # Only when set, so browser-only runs still match the ones before --http
+    if args.http:
+        scenario.update(http=True, wall_rate=args.wall_rate)
+    with tempfile.TemporaryDirectory(prefix="tiktok_bench_") as workdir:
+        result = asyncio.run(run_once(args, workdir))
+    commit = git_commit()
+    entry = {
+        "commit": commit,
+        "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scenario": scenario,
+        "result": result,
+    }
+    on_target = report(entry, previous_run(args.results, scenario, commit))
+    if args.results:
+        with open(args.results, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    return on_target
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scraping pipeline against a fake TikTok.")
+    parser.add_argument("--urls", type=int, nargs="+", default=[1000], help="input rows per run (one run per size)")
+    parser.add_argument("--dup-rate", type=float, default=0.05, help="share of rows repeating an earlier video")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--per-session", type=int, default=8)
+    parser.add_argument("--max-rate", type=float, default=200.0, help="limiter ceiling in req/s")
+    parser.add_argument("--start-rate", type=float, help="limiter starting rate (default: --max-rate)")
+    parser.add_argument("--latency-median", type=float, default=0.3, help="seconds per video.info()")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal spread of latency")
+    parser.add_argument("--session-latency", type=float, default=0.5, help="seconds to open a session")
+    parser.add_argument("--not-found-rate", type=float, default=0.01)
+    parser.add_argument("--transient-rate", type=float, default=0.01)
+    parser.add_argument("--parse-rate", type=float, default=0.002)
+    parser.add_argument("--server-rate", type=float, help="req/s the fake server accepts before throttling")
+    parser.add_argument("--http", action="store_true", help="fetch pages over local HTTP first (webfetch)")
+    parser.add_argument("--wall-rate", type=float, default=0.0, help="share of HTTP fetches walled off")
+    parser.add_argument("--retry-base", type=float, default=0.5, help="first retry backoff in seconds")
+    parser.add_argument("--format", choices=["jsonl", "csv", "xlsx"], default="jsonl")
+    parser.add_argument("--cache", action="store_true", help="write through a fresh SQLite cache")
+    parser.add_argument("--journal", action="store_true", help="checkpoint to a fresh journal")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--results", default="bench_results.jsonl", help="append results here")
+    args = parser.parse_args(argv)
+
+    if args.only is not None or len(args.urls) == 1:
+        args.urls = args.only if args.only is not None else args.urls[0]
+        return 0 if run_single(args) else 1
+    argv = list(argv if argv is not None else sys.argv[1:])
+    status = 0
+    for n in args.urls:
+        status |= subprocess.run([sys.executable, os.path.abspath(__file__), *argv, "--only", str(n)]).returncode
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from urls import extract_video_id
+
+DEFAULT_PATH = os.environ.get("TIKTOK_CACHE_PATH", "tiktok_cache.sqlite3")
+
+
+# --- RESULT CACHE ---
+# Successful get_video_info records keyed by video_id. URLs that carry no
+# numeric ID (short links) are looked up by the exact URL instead. Records
+# older than `ttl` seconds count as misses and get re-fetched.
+class ResultCache:
+    def __init__(self, path=DEFAULT_PATH, ttl=6 * 3600):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            " video_id TEXT PRIMARY KEY, video_url TEXT,"
+            " fetched_at REAL NOT NULL, record TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS videos_url ON videos (video_url)")
+        self._conn.commit()
+
+    def _select(self, column, keys, cutoff):
+        found = {}
+        keys = list(keys)
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = self._conn.execute(
+                f"SELECT {column}, record FROM videos"
+                f" WHERE fetched_at >= ? AND {column} IN ({','.join('?' * len(chunk))})",
+                [cutoff, *chunk]
+            ).fetchall()
+            found.update((k, json.loads(r)) for k, r in rows)
+        return found
+
+    def get_many(self, urls):
+        # Returns {position in urls: record} for every fresh hit
+        cutoff = time.time() - self.ttl
+        ids = {i: extract_video_id(u) for i, u in enumerate(urls)}
+        with self._lock:
+            by_id = self._select("video_id", {v for v in ids.values() if v}, cutoff)
+            by_url = self._select("video_url", {u for i, u in enumerate(urls) if not ids[i]}, cutoff)
+
+        hits = {}
+        for i, url in enumerate(urls):
+            record = by_id.get(ids[i]) if ids[i] else by_url.get(url)
+            if record:
+                hits[i] = {**record, "video_url": url}
+        self.hits += len(hits)
+        self.misses += len(urls) - len(hits)
+        return hits
+
+    def put(self, record):
+        if "error" in record or not record.get("video_id"):
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO videos (video_id, video_url, fetched_at, record)"
+                " VALUES (?, ?, ?, ?)",
+                (str(record["video_id"]), record.get("video_url"), time.time(), json.dumps(record))
+            )
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+import time
+
+import engine
+from cache import ResultCache
+from export import XlsxStreamWriter
+from ingest import ColumnNotFound, UnsupportedFileType, read_column
+from journal import Journal, job_id_for
+from ratelimit import AdaptiveRateLimiter
+from telemetry import Telemetry
+from tokens import TokenPool, parse_tokens
+from urls import UrlPlan
+from webfetch import PageFetcher
+
+# Headless entry point for the same pipeline app.py drives:
+#
+#   python cli.py campaign.xlsx -o results.jsonl --sessions 4 --tokens-file tokens.txt
+#   cat urls.txt | python cli.py - -o results.csv --format csv
+
+
+# --- INPUT ---
+def read_urls(path, column="video_url"):
+    if path == "-":
+        return [line.strip() for line in sys.stdin if line.strip()]
+    try:
+        return read_column(path, column)
+    except ColumnNotFound:
+        sys.exit(f"error: column {column!r} not found in {path}")
+    except UnsupportedFileType as e:
+        sys.exit(f"error: {e}")
+
+
+# --- OUTPUT ---
+class RecordWriter:
+    def __init__(self, path, fmt):
+        self.xlsx = None
+        if fmt == "xlsx":
+            if path == "-":
+                sys.exit("error: --format xlsx needs an --output file")
+            self.xlsx = XlsxStreamWriter(path)
+            return
+        self.file = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+        self.csv = None
+        if fmt == "csv":
+            self.csv = csv.DictWriter(self.file, fieldnames=engine.RECORD_FIELDS + ["error", "error_type", "attempts"],
+                                      extrasaction="ignore")
+            self.csv.writeheader()
+
+    def write(self, record):
+        if self.xlsx:
+            self.xlsx.write(record)
+            return
+        if self.csv:
+            self.csv.writerow(record)
+        else:
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.xlsx:
+            self.xlsx.close()
+        elif self.file is not sys.stdout:
+            self.file.close()
+
+
+def write_metrics(telemetry, path):
+    if not path: return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(telemetry.to_prometheus() if path.endswith(".prom") else telemetry.to_json())
+
+
+async def run_creators(args, tokens):
+    column = "unique_id" if args.column == "video_url" else args.column
+    creators = engine.normalize_unique_ids(read_urls(args.input, column))
+    cache = None if args.no_cache else ResultCache(ttl=args.ttl * 3600)
+    limiter = AdaptiveRateLimiter(max_rate=args.max_rate)
+    writer = RecordWriter(args.output, args.format)
+    telemetry = Telemetry()
+    totals = {"ok": 0, "failed": 0}
+    started = time.monotonic()
+
+    print(f"{len(creators)} creators, up to {args.max_videos} videos each", file=sys.stderr)
+
+    def on_record(i, records):
+        for data in records:
+            writer.write(data)
+            totals["failed" if "error" in data else "ok"] += 1
+        print(f"@{creators[i]}: {len(records)} records", file=sys.stderr)
+
+    try:
+        await engine.run_creator_scraper(
+            creators, TokenPool(tokens), num_sessions=args.sessions,
+            per_session=args.per_session, max_videos=args.max_videos,
+            limiter=limiter, cache=cache, on_record=on_record, telemetry=telemetry
+        )
+    finally:
+        with telemetry.timer("export"):
+            writer.close()
+        write_metrics(telemetry, args.metrics)
+
+    print(f"done: {totals['ok']} videos, {totals['failed']} creators failed "
+          f"in {time.monotonic() - started:.0f}s", file=sys.stderr)
+    return 1 if totals["failed"] and not totals["ok"] else 0
+
+
+async def run(args):
+    tokens = parse_tokens(" ".join(args.token or []) + " " + os.environ.get("MS_TOKENS", ""))
+    if args.tokens_file:
+        with open(args.tokens_file, encoding="utf-8") as f:
+            tokens += [t for t in parse_tokens(f.read()) if t not in tokens]
+    if not tokens:
+        sys.exit("error: no msToken given (use --token, --tokens-file or MS_TOKENS)")
+
+    if args.creators:
+        return await run_creators(args, tokens)
+
+    plan = UrlPlan(read_urls(args.input, args.column))
+    await plan.resolve()
+
+    rows_for = plan.rows_by_fetch()
+    job_id = args.job_id or job_id_for(plan.rows)
+    journal = None if args.no_resume else Journal(job_id, directory=args.jobs_dir)
+    cache = None if args.no_cache else ResultCache(ttl=args.ttl * 3600)
+    limiter = AdaptiveRateLimiter(max_rate=args.max_rate)
+    telemetry = Telemetry()
+    pool = TokenPool(tokens)
+    pages = None if args.browser_only else PageFetcher()
+    writer = RecordWriter(args.output, args.format)
+    written = set()
+    stats = {"done": 0, "failed": 0, "last_log": 0.0}
+    started = time.monotonic()
+
+    print(f"job {job_id}: {len(plan.rows)} rows, {len(plan.fetch_urls)} unique videos",
+          file=sys.stderr)
+
+    def emit(i, data):
+        for row in rows_for.get(i, []):
+            writer.write({**data, "video_url": plan.rows[row]})
+        written.add(i)
+
+    def on_record(i, data):
+        emit(i, data)
+        stats["done"] += 1
+        stats["failed"] += "error" in data
+        now = time.monotonic()
+        if now - stats["last_log"] >= args.log_interval:
+            stats["last_log"] = now
+            snap = telemetry.snapshot()
+            p95 = snap["latency"].get("video_info", {}).get("p95")
+            print(f"{stats['done']} fetched, {stats['failed']} failed, "
+                  f"{snap['throughput_per_min']:.0f}/min, p95 {p95}s, {limiter.rate:.2f} req/s",
+                  file=sys.stderr)
+
+    try:
+        records = await engine.run_scraper(
+            plan.fetch_urls, pool, num_sessions=args.sessions,
+            per_session=args.per_session, limiter=limiter, cache=cache,
+            journal=journal, on_record=on_record, telemetry=telemetry, pages=pages
+        )
+        # Cached and resumed records never pass through on_record
+        for i in records.indices():
+            if i not in written:
+                emit(i, records[i])
+    finally:
+        with telemetry.timer("export"):
+            writer.close()
+        write_metrics(telemetry, args.metrics)
+        if pages:
+            await pages.close()
+    # Finished and written: nothing left to resume
+    if journal:
+        journal.discard()
+
+    ok, failed = records.count(plan.row_to_fetch)
+    hits = cache.hits if cache else 0
+    over_http = pages.hits if pages else 0
+    print(f"done: {ok} ok, {failed} failed, {hits} from cache, {over_http} over HTTP "
+          f"in {time.monotonic() - started:.0f}s", file=sys.stderr)
+    return 1 if failed and not ok else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape TikTok video stats without the Streamlit UI.")
+    parser.add_argument("input", help="xlsx, csv, parquet or txt file of video URLs (or creators), or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    parser.add_argument("--format", choices=["jsonl", "csv", "xlsx"], default="jsonl")
+    parser.add_argument("--column", default="video_url",
+                        help="input column for xlsx/csv (default: video_url, or unique_id with --creators)")
+    parser.add_argument("--creators", action="store_true",
+                        help="input lists creator unique_ids; scrape their recent videos")
+    parser.add_argument("--max-videos", type=int, default=30, help="recent videos per creator")
+    parser.add_argument("--token", action="append", help="msToken (repeatable)")
+    parser.add_argument("--tokens-file", help="file with one msToken per line")
+    parser.add_argument("--sessions", type=int, default=2)
+    parser.add_argument("--per-session", type=int, default=2)
+    parser.add_argument("--max-rate", type=float, default=3.0, help="max requests per second")
+    parser.add_argument("--ttl", type=float, default=6.0, help="cache freshness in hours")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--browser-only", action="store_true",
+                        help="skip the plain-HTTP page fetch and use browser sessions for every video")
+    parser.add_argument("--job-id", help="resume this job instead of the one derived from the input")
+    parser.add_argument("--jobs-dir", default="jobs")
+    parser.add_argument("--no-resume", action="store_true", help="do not read or write a checkpoint journal")
+    parser.add_argument("--metrics", help="write latency/throughput metrics here (.prom for Prometheus, else JSON)")
+    parser.add_argument("--log-interval", type=float, default=5.0, help="seconds between progress lines")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("TikTokApi.tiktok").setLevel(logging.CRITICAL)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,477 @@
+from TikTokApi import TikTokApi
+import asyncio
+import time
+
+from ratelimit import AdaptiveRateLimiter
+from records import RECORD_FIELDS, RecordTable, format_record, to_count
+from retry import NOT_FOUND, PARSE, RETRYABLE, THROTTLED, RetryQueue, classify_error
+from telemetry import timed
+from tokens import TokenPool
+
+# --- UTILITY FUNCTIONS ---
+def format_number(n):
+    if n >= 1_000_000: return f"{n/1_000_000:.1f}M"
+    if n >= 1_000: return f"{n/1_000:.1f}K"
+    return str(n)
+
+def get_hashtags(text_extra):
+    if not text_extra: return ""
+    return ", ".join(filter(None, [h.get("hashtagName") for h in text_extra]))
+
+
+# --- SCRAPING LOGIC ---
+def raw_record(url, info, author_stats=None):
+    # `info` is a video item as returned by video.info() or a user's feed;
+    # feed items may lack authorStats, so those can be passed in separately.
+    # This is the one place counters are coerced; times stay epoch seconds
+    # (None if unreadable) until the record is stored or written.
+    author = info.get("author", {})
+    author_stats = author_stats or info.get("authorStats", {})
+    stats = info.get("stats", {})
+    stats_v2 = info.get("statsV2", {})
+    music = info.get("music", {})
+    video_data = info.get("video", {})
+
+    try:
+        created = int(info.get("createTime", 0))
+    except (TypeError, ValueError):
+        created = None
+
+    return {
+        "video_url": url,
+        "create_time": created,
+        "video_id": info.get("id") or video_data.get("id"),
+        "author_id": author.get("id"),
+        "unique_id": author.get("uniqueId"),
+        "nickname": author.get("nickname"),
+        "music_title": music.get("title"),
+        "is_copyrighted": music.get("isCopyrighted"),
+        "play_url": video_data.get("playAddr"),
+        "author_name": music.get("authorName"),
+        "hashtags": get_hashtags(info.get("textExtra")),
+        "follower_count": to_count(author_stats.get("followerCount")),
+        "heart_count": to_count(author_stats.get("heart")),
+        "video_count": to_count(author_stats.get("videoCount")),
+        "like_count": to_count(stats.get("diggCount")),
+        "comment_count": to_count(stats.get("commentCount")),
+        "play_count": to_count(stats.get("playCount")),
+        "collect_count": to_count(stats_v2.get("collectCount") or stats.get("collectCount")),
+        "share_count": to_count(stats.get("shareCount")),
+        "repost_count": to_count(stats_v2.get("repostCount") or stats.get("repostCount")),
+        "scraped_at": int(time.time())
+    }
+
+
+def build_record(url, info, author_stats=None):
+    return format_record(raw_record(url, info, author_stats))
+
+
+async def get_video_info(url, api, session_index=None):
+    # A raw record (see raw_record) or an error record
+    try:
+        video = api.video(url=url)
+        info = await video.info(session_index=session_index)
+        if not info:
+            return {"video_url": url, "error": "No data returned from TikTok", "error_type": THROTTLED}
+        return raw_record(url, info)
+    except Exception as e:
+        return {"video_url": url, "error": str(e), "error_type": classify_error(e)}
+
+
+async def get_video_page(url, pages):
+    # Same record as get_video_info, from the page over plain HTTP (webfetch)
+    try:
+        return raw_record(url, await pages.item(url))
+    except Exception as e:
+        return {"video_url": url, "error": str(e) or type(e).__name__, "error_type": classify_error(e)}
+
+
+def normalize_unique_ids(values):
+    # "@Handle", "handle " and "HANDLE" are the same creator
+    seen, out = set(), []
+    for v in values:
+        uid = str(v).strip().lstrip("@")
+        if uid and uid.lower() not in seen:
+            seen.add(uid.lower())
+            out.append(uid)
+    return out
+
+
+async def get_creator_videos(unique_id, api, limiter, session_index=None,
+                             max_videos=30, page_size=30):
+    # Author stats come from one user.info() call and are shared by every
+    # video in the feed, instead of one video.info() lookup per video
+    unique_id = unique_id.strip().lstrip("@")
+    profile_url = f"https://www.tiktok.com/@{unique_id}"
+    try:
+        user = api.user(username=unique_id)
+        await limiter.acquire()
+        info = await user.info(session_index=session_index)
+        user_info = (info or {}).get("userInfo", {})
+        if not user_info.get("user"):
+            # An empty profile payload is how throttling usually shows up
+            if info:
+                limiter.success()
+                return [{"video_url": profile_url, "unique_id": unique_id,
+                         "error": "Creator not found", "error_type": NOT_FOUND}]
+            limiter.failure()
+            return [{"video_url": profile_url, "unique_id": unique_id,
+                     "error": "No data returned from TikTok", "error_type": THROTTLED}]
+        limiter.success()
+        author_stats = user_info.get("stats", {})
+
+        records = []
+        await limiter.acquire()
+        async for video in user.videos(count=max_videos, session_index=session_index):
+            item = video.as_dict
+            url = f"{profile_url}/video/{item.get('id')}"
+            records.append(build_record(url, item, author_stats))
+            # Feed pages are fetched inside user.videos(); pace each new page
+            if len(records) % page_size == 0 and len(records) < max_videos:
+                limiter.success()
+                await limiter.acquire()
+            if len(records) >= max_videos:
+                break
+        limiter.success()
+        return records
+    except Exception as e:
+        error_type = classify_error(e)
+        if error_type == THROTTLED:
+            limiter.failure()
+        return [{"video_url": profile_url, "unique_id": unique_id, "error": str(e), "error_type": error_type}]
+
+
+# --- SESSIONS ---
+async def open_session(api, ms_token, telemetry=None):
+    # TikTokApi only exposes create_sessions, which launches a new browser;
+    # adding one session to the running browser needs its private helper
+    with timed(telemetry, "session_create"):
+        await api._TikTokApi__create_session(ms_token=ms_token, sleep_after=3)
+    return api.sessions.pop()
+
+async def close_session(session):
+    try:
+        await session.page.close()
+        await session.context.close()
+    except Exception:
+        pass
+
+async def session_alive(session, timeout=5):
+    try:
+        if session.page.is_closed(): return False
+        await asyncio.wait_for(session.page.evaluate("1"), timeout)
+        return True
+    except Exception:
+        return False
+
+async def ensure_sessions(api, pool, num_sessions, telemetry=None):
+    # Keeps the live sessions of `api` whose token is still healthy in `pool`,
+    # closes the rest and opens new ones until there are `num_sessions`. On a
+    # fresh api this launches the browser; on a warm one it only tops up.
+    keep = []
+    for session in list(api.sessions):
+        h = pool.health.get(getattr(session, "ms_token", None))
+        if len(keep) < num_sessions and h and not h.retired and await session_alive(session):
+            keep.append(session)
+        else:
+            await close_session(session)
+    api.sessions[:] = keep
+    # Counted afresh on every call (once per turn), never on top of the last
+    pool.set_sessions(getattr(s, "ms_token", None) for s in keep)
+
+    missing = pool.assign(num_sessions - len(keep))
+    if missing and getattr(api, "browser", None) is None:
+        with timed(telemetry, "session_create"):
+            await api.create_sessions(
+                ms_tokens=missing[:1], num_sessions=1,
+                sleep_after=3, browser="chromium"
+            )
+        missing = missing[1:]
+    extra = await asyncio.gather(
+        *[open_session(api, t, telemetry) for t in missing],
+        return_exceptions=True
+    )
+    # Sessions that failed to open leave their slot to the others
+    api.sessions.extend(s for s in extra if not isinstance(s, BaseException))
+    api.num_sessions = len(api.sessions)
+    slots = [getattr(s, "ms_token", None) for s in api.sessions]
+    pool.set_sessions(slots)
+    return slots
+
+
+# --- WORKER POOL ---
+# Every session gets `per_session` workers pinned to it, so a session never has
+# more than that many requests in flight. Workers pull items from a shared
+# queue and hand each to `handle(api, session_index, item)`, which returns
+# whether the session's token looked healthy. Items that `handle` deferred to
+# `retries` are picked up once the main queue is empty.
+#
+# `pool` spreads sessions over its msTokens; when a token degrades its session
+# is swapped in place for one on a healthy token, so the batch carries on
+# without restarting. Passing a warm `api` (see sessions.SessionManager)
+# reuses its sessions and leaves them open afterwards; otherwise a browser is
+# launched for this run.
+async def run_pool(items, pool, handle, num_sessions=1, per_session=1, api=None,
+                   retries=None, telemetry=None):
+    swap_lock = asyncio.Lock()
+    queue = asyncio.Queue()
+    in_flight = [0]
+    for item in items:
+        queue.put_nowait(item)
+    if queue.empty():
+        return
+
+    async def next_item():
+        while True:
+            if not queue.empty():
+                in_flight[0] += 1
+                return queue.get_nowait()
+            if retries and retries.pending:
+                in_flight[0] += 1
+                return await retries.next()
+            # Items still in flight may yet be deferred for a retry
+            if in_flight[0] == 0:
+                return None
+            await asyncio.sleep(0.1)
+
+    async def rotate(api, slots, session_index, token):
+        async with swap_lock:
+            # Another worker on this slot may have rotated it already
+            if slots[session_index] != token or not pool.is_degraded(token):
+                return
+            new_token = pool.replacement(token)
+            if new_token is None:
+                return
+            try:
+                new_session = await open_session(api, new_token, telemetry)
+            except Exception:
+                return
+            old_session = api.sessions[session_index]
+            api.sessions[session_index] = new_session
+            slots[session_index] = new_token
+            await close_session(old_session)
+
+    async def worker(api, slots, session_index):
+        while True:
+            item = await next_item()
+            if item is None:
+                return
+            token = slots[session_index]
+            started = time.monotonic()
+            try:
+                ok = await handle(api, session_index, item)
+            finally:
+                in_flight[0] -= 1
+            pool.record(token, ok, time.monotonic() - started)
+            if pool.is_degraded(token):
+                await rotate(api, slots, session_index, token)
+
+    async def run_workers(api):
+        slots = await ensure_sessions(api, pool, num_sessions, telemetry)
+        await asyncio.gather(*[
+            worker(api, slots, s)
+            for s in range(len(slots))
+            for _ in range(per_session)
+        ])
+
+    if api is not None:
+        await run_workers(api)
+    else:
+        async with TikTokApi() as api:
+            await run_workers(api)
+
+
+# Fetches `items` over plain HTTP ahead of the browser: `pages.concurrency`
+# workers hand each item to `handle(item)` until the list runs out or the
+# fetcher gives up on HTTP (see webfetch.PageFetcher.enabled).
+async def run_pages(items, pages, handle):
+    items = iter(items)
+
+    async def worker():
+        for item in items:
+            if not pages.enabled:
+                return
+            await handle(item)
+
+    await asyncio.gather(*[worker() for _ in range(pages.concurrency)])
+
+
+def as_pool(ms_tokens):
+    return ms_tokens if isinstance(ms_tokens, TokenPool) else TokenPool(list(ms_tokens))
+
+
+# --- SCRAPER ENGINE ---
+# Scrapes `video_urls` and returns a records.RecordTable lined up with them
+# row by row; index it like a list of records. Request pacing is left to
+# `limiter`, shared by all workers; `ms_tokens` is a list of tokens or a
+# TokenPool.
+#
+# Transient and throttled failures go to `retries` and are retried with
+# backoff after the main pass; not-found and parse errors fail straight away.
+# Only final outcomes reach `on_record`, the journal and the cache.
+#
+# With a `journal`, records from an earlier run of the same job are taken from
+# it (all but retryable failures) and every new record is appended as it
+# completes. With a `cache`, fresh records are served from it. With `pages`
+# (a webfetch.PageFetcher), the rest are first tried over plain HTTP, which
+# settles most videos for a fraction of a browser tab's memory and CPU; a
+# page that fails for any reason but the video being gone goes on to the
+# browser. Only what is left is queued; if nothing is, no browser is
+# started at all.
+#
+# With a `turn` (an async context manager factory yielding the api, see
+# sessions.SessionManager.turn) instead of an `api`, what is left is scraped
+# `turn_size` videos per turn, so jobs sharing one browser take turns on it.
+async def run_scraper(video_urls, ms_tokens, num_sessions=1, per_session=1,
+                      limiter=None, cache=None, journal=None, on_record=None,
+                      api=None, retries=None, telemetry=None, pages=None,
+                      turn=None, turn_size=200):
+    records = RecordTable(len(video_urls))
+    limiter = limiter or AdaptiveRateLimiter()
+    retries = retries or RetryQueue()
+
+    done = journal.load() if journal else {}
+    for idx, url in enumerate(video_urls):
+        data = done.get(url)
+        if data and ("error" not in data or data.get("error_type") in (NOT_FOUND, PARSE)):
+            records.put(idx, data)
+    if journal:
+        journal.resumed = len(records.indices())
+
+    pending = [idx for idx in range(len(video_urls)) if not records.has(idx)]
+    cached = cache.get_many([video_urls[i] for i in pending]) if cache else {}
+    for pos, data in cached.items():
+        records.put(pending[pos], data)
+
+    def finish(idx, data):
+        # Stored raw; times are formatted only for consumers that keep the
+        # record as a dict
+        records.put(idx, data)
+        if not (journal or cache or on_record):
+            return
+        data = format_record(data)
+        if journal:
+            journal.append(video_urls[idx], data)
+        if cache and "error" not in data:
+            cache.put(data)
+        if on_record:
+            on_record(idx, data)
+
+    async def handle_page(idx):
+        await limiter.acquire()
+        with timed(telemetry, "video_page"):
+            data = await get_video_page(video_urls[idx], pages)
+        error_type = data.get("error_type")
+        # Misses are left for the browser without counting against the
+        # limiter; it hears about them if the browser fails too
+        if error_type in (None, NOT_FOUND):
+            limiter.success()
+            if telemetry:
+                telemetry.record_outcome(error_type or "ok")
+            finish(idx, data)
+
+    async def handle(api, session_index, idx):
+        url = video_urls[idx]
+        await limiter.acquire()
+        with timed(telemetry, "video_info"):
+            data = await get_video_info(url, api, session_index=session_index)
+        error_type = data.get("error_type")
+        if telemetry:
+            telemetry.record_outcome(error_type or "ok", session_index)
+        healthy = error_type not in RETRYABLE
+        # Only throttling is a reason to slow down. Not-found and parse
+        # errors are answers; timeouts and network errors are just retried
+        # with the RetryQueue backoff.
+        if error_type == THROTTLED:
+            limiter.failure()
+        elif healthy:
+            limiter.success()
+        if error_type:
+            if retries.defer(idx, error_type):
+                return healthy
+            data["attempts"] = retries.attempts_for(idx)
+        finish(idx, data)
+        return healthy
+
+    pool = as_pool(ms_tokens)
+
+    async def scrape(batch, api):
+        if pages is not None:
+            await run_pages([idx for idx in batch if not records.has(idx)], pages, handle_page)
+        await run_pool(
+            [idx for idx in batch if not records.has(idx)], pool,
+            handle, num_sessions=num_sessions, per_session=per_session, api=api,
+            retries=retries, telemetry=telemetry
+        )
+
+    try:
+        if turn is None:
+            await scrape(pending, api)
+        else:
+            for start in range(0, len(pending), turn_size):
+                async with turn() as api:
+                    await scrape(pending[start:start + turn_size], api)
+    finally:
+        if journal:
+            journal.close()
+
+    return records
+
+
+# --- CREATOR ENGINE ---
+# Pulls up to `max_videos` recent videos for each creator in `unique_ids`,
+# creators running concurrently on the same worker pool. Returns one list of
+# records per creator, in input order; a creator that fails yields a single
+# error record. `on_record(i, records)` fires as each creator completes.
+# `turn` is as for run_scraper, `turn_size` creators per turn.
+async def run_creator_scraper(unique_ids, ms_tokens, num_sessions=1, per_session=1,
+                              max_videos=30, limiter=None, cache=None,
+                              on_record=None, api=None, retries=None, telemetry=None,
+                              turn=None, turn_size=10):
+    results = [None] * len(unique_ids)
+    limiter = limiter or AdaptiveRateLimiter()
+    retries = retries or RetryQueue()
+
+    async def handle(api, session_index, i):
+        with timed(telemetry, "creator_feed"):
+            records = await get_creator_videos(
+                unique_ids[i], api, limiter, session_index=session_index,
+                max_videos=max_videos
+            )
+        error_type = records[0].get("error_type") if records else None
+        if telemetry:
+            telemetry.record_outcome(error_type or "ok", session_index)
+        if error_type:
+            if retries.defer(i, error_type):
+                return error_type not in RETRYABLE
+            records[0]["attempts"] = retries.attempts_for(i)
+        results[i] = records
+        if cache:
+            for data in records:
+                cache.put(data)
+        if on_record:
+            on_record(i, records)
+        return error_type not in RETRYABLE
+
+    pool = as_pool(ms_tokens)
+
+    async def scrape(batch, api):
+        await run_pool(
+            batch, pool, handle,
+            num_sessions=num_sessions, per_session=per_session, api=api,
+            retries=retries, telemetry=telemetry
+        )
+
+    if turn is None:
+        await scrape(range(len(unique_ids)), api)
+    else:
+        for start in range(0, len(unique_ids), turn_size):
+            async with turn() as api:
+                await scrape(range(start, min(start + turn_size, len(unique_ids))), api)
+    return results
+
+
+def split_records(records):
+    results = [r for r in records if r and "error" not in r]
+    failed = [r for r in records if r and "error" in r]
+    return results, failed
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import time
+
+from openpyxl import Workbook
+
+from engine import RECORD_FIELDS
+
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "tiktok_exports")
+FAILED_FIELDS = ["video_url", "error", "error_type", "attempts"]
+
+
+def purge_old_exports(directory=EXPORT_DIR, max_age=24 * 3600):
+    if not os.path.isdir(directory): return
+    cutoff = time.time() - max_age
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+# --- STREAMING XLSX WRITER ---
+# openpyxl write-only mode streams each appended row to a temp file on disk
+# instead of building cell objects, so memory stays flat however many rows
+# go in. Rows are appended while the scrape runs; close() writes the final
+# workbook to `path` (a spooled temp file by default) for download.
+class XlsxStreamWriter:
+    def __init__(self, path=None):
+        if path is None:
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            purge_old_exports()
+            fd, path = tempfile.mkstemp(suffix=".xlsx", dir=EXPORT_DIR)
+            os.close(fd)
+        self.path = path
+        self.success = 0
+        self.failed = 0
+        self._wb = Workbook(write_only=True)
+        self._ok_sheet = self._wb.create_sheet("✅ Success")
+        self._fail_sheet = self._wb.create_sheet("❌ Failed")
+        self._ok_sheet.append(RECORD_FIELDS)
+        self._fail_sheet.append(FAILED_FIELDS)
+
+    def write(self, record):
+        if "error" in record:
+            self._fail_sheet.append([record.get(f) for f in FAILED_FIELDS])
+            self.failed += 1
+        else:
+            self._ok_sheet.append([record.get(f) for f in RECORD_FIELDS])
+            self.success += 1
+
+    def close(self):
+        self._wb.save(self.path)
+        return self.path
@@ -0,0 +1,240 @@
+import asyncio
+import json
+import math
+import random
+import time
+import zlib
+
+# In-process stand-in for TikTokApi, used by bench.py to drive the real
+# pipeline without touching TikTok. It covers the surface engine.py uses:
+# create_sessions / the private per-session helper, api.sessions, and
+# video(url=).info(session_index=). Latency is lognormal, errors are drawn per
+# request, and a server-side token bucket answers with empty payloads or
+# captchas once requests come in faster than `server_rate`, the way TikTok
+# throttles. FakePageServer serves the same videos as HTML pages over local
+# HTTP for webfetch's fast path.
+
+
+class FakeServer:
+    def __init__(self, latency_median=0.3, latency_sigma=0.5, not_found_rate=0.01,
+                 transient_rate=0.01, parse_rate=0.002, server_rate=None,
+                 session_latency=0.5, seed=0):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.not_found_rate = not_found_rate
+        self.transient_rate = transient_rate
+        self.parse_rate = parse_rate
+        self.server_rate = server_rate
+        self.session_latency = session_latency
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.throttled = 0
+        self._tokens = server_rate or 0
+        self._last = time.monotonic()
+
+    def latency(self):
+        return self.latency_median * math.exp(self.rng.gauss(0, self.latency_sigma))
+
+    def _over_rate(self):
+        if not self.server_rate: return False
+        now = time.monotonic()
+        self._tokens = min(self.server_rate, self._tokens + (now - self._last) * self.server_rate)
+        self._last = now
+        if self._tokens < 1:
+            return True
+        self._tokens -= 1
+        return False
+
+    async def video_info(self, url):
+        self.requests += 1
+        await asyncio.sleep(self.latency())
+        if self._over_rate():
+            self.throttled += 1
+            if self.rng.random() < 0.5:
+                return {}
+            raise RuntimeError("Captcha required")
+        roll = self.rng.random()
+        if roll < self.not_found_rate:
+            raise RuntimeError("Video not found (statusCode 10204)")
+        roll -= self.not_found_rate
+        if roll < self.transient_rate:
+            raise asyncio.TimeoutError()
+        roll -= self.transient_rate
+        if roll < self.parse_rate:
+            raise ValueError("Invalid JSON in rehydration data")
+        return fake_item(url)
+
+
+def fake_item(url):
+    # Shaped like a real itemStruct, including the nested fields build_record
+    # ignores, so payload handling costs roughly what it does in production
+    video_id = url.rstrip("/").rsplit("/", 1)[-1]
+    n = zlib.crc32(video_id.encode())
+    handle = f"creator{n % 5000}"
+    tags = [f"tag{(n >> i) % 97}" for i in range(0, 15, 3)]
+    return {
+        "id": video_id,
+        "desc": " ".join(f"#{t}" for t in tags) + " lorem ipsum dolor sit amet",
+        "createTime": 1_690_000_000 + n % 20_000_000,
+        "author": {
+            "id": str(6_800_000_000_000_000_000 + n % 5000), "uniqueId": handle,
+            "nickname": handle.title(), "signature": "x" * 80, "verified": False,
+            "avatarThumb": f"https://p16-sign.tiktokcdn.com/{handle}~tplv-100x100.jpeg",
+            "avatarLarger": f"https://p16-sign.tiktokcdn.com/{handle}~tplv-1080x1080.jpeg",
+        },
+        "authorStats": {"followerCount": n % 2_000_000, "followingCount": n % 900,
+                        "heart": n % 50_000_000, "heartCount": n % 50_000_000,
+                        "videoCount": n % 3000, "diggCount": n % 10_000},
+        "stats": {"diggCount": n % 400_000, "shareCount": n % 9000, "commentCount": n % 12_000,
+                  "playCount": n % 9_000_000, "collectCount": n % 20_000},
+        "statsV2": {"diggCount": str(n % 400_000), "shareCount": str(n % 9000),
+                    "commentCount": str(n % 12_000), "playCount": str(n % 9_000_000),
+                    "collectCount": str(n % 20_000), "repostCount": "0"},
+        "music": {"id": str(n), "title": f"original sound - {handle}", "authorName": handle.title(),
+                  "original": True, "isCopyrighted": False, "duration": 30,
+                  "playUrl": f"https://sf16-ies-music.tiktokcdn.com/obj/{n}.mp3"},
+        "video": {
+            "id": video_id, "height": 1024, "width": 576, "duration": 30, "ratio": "540p",
+            "playAddr": f"https://v16-webapp-prime.tiktok.com/video/tos/alisg/{n:x}/?a=1988&br=1234" + "&x=" + "a" * 300,
+            "downloadAddr": f"https://v16-webapp-prime.tiktok.com/video/tos/alisg/{n:x}/dl" + "&y=" + "b" * 300,
+            "bitrateInfo": [{"Bitrate": 400_000 * (i + 1), "QualityType": 10 + i,
+                             "PlayAddr": {"UrlList": [f"https://v{i}.tiktokcdn.com/{n:x}" + "c" * 200] * 3}}
+                            for i in range(3)],
+        },
+        "textExtra": [{"hashtagName": t, "hashtagId": str(i), "type": 1} for i, t in enumerate(tags)],
+        "challenges": [{"id": str(i), "title": t, "desc": ""} for i, t in enumerate(tags)],
+    }
+
+
+# --- VIDEO PAGES ---
+WALL_PAGE = "<!DOCTYPE html><html><head><title>Security Check</title></head><body></body></html>"
+
+
+def video_page(item=None, status=0, padding=0):
+    # A video page the way TikTok serves one: the itemStruct inside the
+    # rehydration script, behind `padding` bytes of unrelated markup
+    detail = {"statusCode": status, "statusMsg": "item doesn't exist" if status else ""}
+    if item:
+        detail["itemInfo"] = {"itemStruct": item}
+    data = json.dumps({"__DEFAULT_SCOPE__": {"webapp.video-detail": detail}}).replace("</", "<\\/")
+    return ('<!DOCTYPE html><html><head><title>TikTok</title>'
+            f'<script>var __filler = "{"x" * padding}";</script></head><body><div id="app"></div>'
+            f'<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">{data}</script>'
+            '</body></html>')
+
+
+class FakePageServer:
+    # Serves `server`'s videos at /@user/video/<id> with its latency and error
+    # mix: not-found videos get a status-code page, throttling and captchas the
+    # verify wall, timeouts a 503 and parse errors a truncated script. A share
+    # `wall_rate` of requests is walled regardless, the way TikTok turns away
+    # some clients that are not a browser.
+    def __init__(self, server, wall_rate=0.0, padding=150_000):
+        self.server = server
+        self.wall_rate = wall_rate
+        self.padding = padding
+        self._server = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._server = await asyncio.start_server(self._handle, host, port)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _page(self, path):
+        if self.server.rng.random() < self.wall_rate:
+            return "200 OK", WALL_PAGE
+        try:
+            item = await self.server.video_info("https://www.tiktok.com" + path)
+        except asyncio.TimeoutError:
+            return "503 Service Unavailable", ""
+        except ValueError:
+            return "200 OK", video_page({"id": "0"}, padding=self.padding)[:-40]
+        except RuntimeError as e:
+            if "not found" in str(e).lower():
+                return "200 OK", video_page(status=10204, padding=self.padding)
+            return "200 OK", WALL_PAGE
+        return "200 OK", (video_page(item, padding=self.padding) if item else WALL_PAGE)
+
+    async def _handle(self, reader, writer):
+        # Just enough HTTP/1.1 for a keep-alive client doing GETs
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                status, body = await self._page(request.split()[1].decode())
+                body = body.encode()
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/html; charset=utf-8\r\n"
+                             f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+                await writer.drain()
+        except (ConnectionError, IndexError):
+            pass
+        finally:
+            writer.close()
+
+
+class _Page:
+    def __init__(self):
+        self._closed = False
+
+    def is_closed(self):
+        return self._closed
+
+    async def evaluate(self, script):
+        return 1
+
+    async def close(self):
+        self._closed = True
+
+
+class _Session:
+    def __init__(self, ms_token):
+        self.ms_token = ms_token
+        self.page = _Page()
+        self.context = _Page()
+
+
+class _Browser:
+    def is_connected(self):
+        return True
+
+
+class _Video:
+    def __init__(self, server, url):
+        self.server = server
+        self.url = url
+
+    async def info(self, session_index=None, **kwargs):
+        return await self.server.video_info(self.url)
+
+
+class FakeTikTokApi:
+    def __init__(self, server=None):
+        self.server = server or FakeServer()
+        self.sessions = []
+        self.browser = None
+        self.num_sessions = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.sessions.clear()
+
+    async def create_sessions(self, ms_tokens=None, num_sessions=1, **kwargs):
+        self.browser = _Browser()
+        for i in range(num_sessions):
+            await self._TikTokApi__create_session(ms_token=ms_tokens[i % len(ms_tokens)])
+
+    async def _TikTokApi__create_session(self, ms_token=None, **kwargs):
+        await asyncio.sleep(self.server.session_latency)
+        self.sessions.append(_Session(ms_token))
+
+    def video(self, url=None, **kwargs):
+        return _Video(self.server, url)
@@ -0,0 +1,517 @@
+import hashlib
+import io
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PATH = os.environ.get("TIKTOK_CAMPAIGNS_PATH", "tiktok_campaigns.sqlite3")
+
+CAMPAIGNS_COL = "Total Campaign"
+ROWS_COL = "Total Campaign Content"
+
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def read_campaign(data, name):
+    # One uploaded campaign file (csv or xlsx bytes) as a DataFrame
+    if name.lower().endswith(".csv"):
+        return pd.read_csv(io.BytesIO(data))
+    return pd.read_excel(io.BytesIO(data))
+
+
+# --- AMOUNTS ---
+# Rupiah amounts as exports and analysts write them: "Rp1.234.567,89",
+# "IDR 2.500", "Rp 5.000,-", "1,2 jt", "Rp 2,5 rb", "1.5m", "(1.000)",
+# plus English-style "1,234.50". The separator that comes last is the
+# decimal one when both appear; a lone "." or "," followed by exactly three
+# digits groups thousands, unit or not ("1.500" is 1500, "1.500 jt" 1.5
+# billion, "1,5 jt" 1.5 million). A trailing ",-" or ".-" means no cents.
+# Thousands groups after the first are exactly three digits; a number with
+# spaces inside, doubled separators or other group sizes is unparseable.
+#
+# Each distinct cell is parsed once. Plain amounts (digits, separators, an
+# Rp/IDR/$ prefix, a sign) are decoded straight from a matrix of code points
+# with numpy; the rest, units and all, go through AMOUNT_RE one by one.
+
+# Unit suffixes, case-insensitive. "m" is juta, the way analysts shorten
+# Rp 1.500.000 to "1.5m"; billions are always spelled out.
+UNITS = {
+    "rb": 1e3, "ribu": 1e3, "k": 1e3,
+    "jt": 1e6, "juta": 1e6, "m": 1e6,
+    "mlr": 1e9, "miliar": 1e9,
+}
+AMOUNT_RE = re.compile(r"^\s*(?P<open>[-(])?\s*(?:rp\.?|idr|\$)?\s*(?P<minus>-)?\s*"
+                       r"(?P<num>\d+(?:[.,]\d+)*)(?:[.,]-)?\s*"
+                       rf"(?P<unit>{'|'.join(sorted(UNITS, key=len, reverse=True))})?\.?\s*\)?\s*$",
+                       re.IGNORECASE)
+BLANKS = {"", "-", "—", "–", "n/a", "na", "nan", "none", "null"}
+
+UNPARSED_EXAMPLES = 5
+
+FAST_WIDTH = 32
+FAST_CHUNK = 250_000
+
+
+def _signature(word):
+    return sum(ord(c) << (7 * i) for i, c in enumerate(word))
+
+
+PREFIXES = np.array([_signature("rp"), _signature("idr")])
+
+
+def _decimal_position(dots, commas, last_dot, last_comma, lone):
+    # Index of the decimal separator per row, or -1 when it has none
+    comma_decimal = (commas > 0) & (((dots > 0) & (last_comma > last_dot)) | ((dots == 0) & (commas == 1) & lone))
+    dot_decimal = (dots > 0) & (((commas > 0) & (last_dot > last_comma)) | ((commas == 0) & (dots == 1) & lone))
+    return np.where(comma_decimal, last_comma, np.where(dot_decimal, last_dot, -1))
+
+
+def _parse_plain(text):
+    # text: array of str up to FAST_WIDTH long. Returns (amounts, parsed);
+    # rows outside the plain shape are left to _parse_general.
+    wide = np.asarray(text, dtype=f"U{FAST_WIDTH}").view(np.uint32).reshape(len(text), FAST_WIDTH)
+    ascii_only = (wide < 128).all(1)
+    m = np.where(wide == 0xA0, 32, wide).astype(np.uint8)
+    pos = np.arange(FAST_WIDTH, dtype=np.int8)
+    digit = (m >= 48) & (m <= 57)
+    dot, comma = m == 46, m == 44
+    first = np.where(digit.any(1), digit.argmax(1), FAST_WIDTH)
+    before = pos < first[:, None]
+
+    lower = m | 0x20
+    letter = before & (lower >= 97) & (lower <= 122)
+    rank = np.cumsum(letter, 1, dtype=np.int8) - 1
+    signature = np.where(letter, lower.astype(np.int64) << (7 * np.clip(rank, 0, 8)), 0).sum(1)
+    prefix_ok = ~letter.any(1) | np.isin(signature, PREFIXES)
+    sign = before & ((m == 45) | (m == 40))
+    space = (m == 32) | (m == 0) | (m == 9)
+    head_ok = (~before | letter | sign | space | (m == 36)).all(1)
+    # The number itself is digits and single separators; only spaces or a
+    # closing bracket follow it
+    sep = dot | comma
+    last_digit = np.where(digit.any(1), FAST_WIDTH - 1 - digit[:, ::-1].argmax(1), -1)
+    inside = ~before & (pos <= last_digit[:, None])
+    number_ok = (~inside | digit | sep).all(1) & ~(sep[:, 1:] & sep[:, :-1]).any(1)
+    tail_ok = (before | inside | space | (m == 41)).all(1)
+    digits_right = np.cumsum(digit[:, ::-1], 1, dtype=np.int8)[:, ::-1]
+    plain = (ascii_only & (first < FAST_WIDTH) & prefix_ok & head_ok & number_ok & tail_ok
+             & (digits_right[:, 0] <= 15))
+
+    last_dot = np.where(dot.any(1), FAST_WIDTH - 1 - dot[:, ::-1].argmax(1), -1)
+    last_comma = np.where(comma.any(1), FAST_WIDTH - 1 - comma[:, ::-1].argmax(1), -1)
+    # Digits from a position to the end of the cell, so the digits after
+    # any separator are one lookup
+    ahead = np.concatenate([digits_right, np.zeros((len(m), 1), np.int8)], 1)
+    rows = np.arange(len(m))
+    after = ahead[rows, np.maximum(last_dot, last_comma) + 1]
+    decimal = _decimal_position(dot.sum(1), comma.sum(1), last_dot, last_comma, after != 3)
+    # Digits in the run starting at each position: every thousands
+    # separator is followed by three, and the first group has at most three
+    next_other = np.minimum.accumulate(np.where(digit, FAST_WIDTH, pos)[:, ::-1], 1)[:, ::-1]
+    run = np.concatenate([next_other - pos, np.zeros((len(m), 1), np.int8)], 1)
+    grouping = sep & (pos != decimal[:, None])
+    plain &= (~grouping | (run[:, 1:] == 3)).all(1)
+    plain &= ~grouping.any(1) | (run[rows, np.minimum(first, FAST_WIDTH - 1)] <= 3)
+
+    # All digits as one integer, then scaled by the digits after the decimal
+    powers = 10 ** np.arange(19, dtype=np.int64)
+    mantissa = np.where(digit, (m - 48) * powers[np.clip(digits_right - 1, 0, 18)], 0).sum(1)
+    fraction = np.where(decimal >= 0, ahead[rows, decimal + 1], 0)
+    amounts = mantissa / 10.0 ** fraction
+    amounts = np.where(sign.any(1), -amounts, amounts)
+    return np.where(plain, amounts, np.nan), plain
+
+
+def _parse_general(text):
+    # One cell the plain decoder turned down: NaN unless AMOUNT_RE takes it
+    m = AMOUNT_RE.match(text.replace("\u00a0", " "))
+    if not m:
+        return np.nan
+    num, unit = m["num"], (m["unit"] or "").lower()
+    last_dot, last_comma = num.rfind("."), num.rfind(",")
+    after = len(num) - 1 - max(last_dot, last_comma)
+    decimal = int(_decimal_position(num.count("."), num.count(","), last_dot, last_comma, after != 3))
+    whole, fraction = (num[:decimal], num[decimal + 1:]) if decimal >= 0 else (num, "")
+    groups = re.split(r"[.,]", whole)
+    if len(groups) > 1 and (len(groups[0]) > 3 or any(len(g) != 3 for g in groups[1:])):
+        return np.nan
+    amount = float(re.sub(r"[.,]", "", whole) + "." + re.sub(r"[.,]", "", fraction)) * UNITS.get(unit, 1.0)
+    return -amount if m["open"] or m["minus"] else amount
+
+
+def parse_amounts(values):
+    # (amounts as float64, mask of cells that held something unparseable);
+    # blanks and dashes are NaN without counting as unparseable
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype("float64"), pd.Series(False, index=values.index)
+    codes, uniques = pd.factorize(values)
+    text = np.asarray(uniques, dtype=object)
+    amounts = np.full(len(text), np.nan)
+    todo = np.ones(len(text), dtype=bool)
+    if not pd.api.types.is_string_dtype(values):
+        # Mixed columns: numbers Excel stored as numbers are amounts already
+        numeric = np.array([isinstance(v, (int, float, np.number)) and not isinstance(v, bool) for v in text], dtype=bool)
+        amounts[numeric] = text[numeric].astype("float64")
+        todo &= ~numeric
+        text = np.array([str(v) for v in text], dtype=object)
+
+    short = np.flatnonzero(todo & (np.fromiter(map(len, text), dtype=np.int64, count=len(text)) <= FAST_WIDTH))
+    for start in range(0, len(short), FAST_CHUNK):
+        chunk = short[start:start + FAST_CHUNK]
+        parsed, plain = _parse_plain(text[chunk])
+        amounts[chunk[plain]] = parsed[plain]
+        todo[chunk[plain]] = False
+    for i in np.flatnonzero(todo):
+        if text[i].strip().lower() in BLANKS:
+            todo[i] = False
+        else:
+            amounts[i] = _parse_general(text[i])
+
+    bad = todo & np.isnan(amounts)
+    found = codes >= 0
+    return (pd.Series(np.where(found, amounts[codes], np.nan), index=values.index),
+            pd.Series(found & bad[codes], index=values.index))
+
+
+# --- CREATOR INDEX ---
+# Pasted usernames rarely match the export byte for byte: "@Budi.Shop ",
+# "budi.shop" and a full-width "ｂｕｄｉ.shop" are the same creator. Names are
+# matched on a normalized key (NFKC, case-folded, trimmed, leading "@"
+# dropped) through a dict, so a bulk lookup is one probe per query. Misses
+# get near-match suggestions from a trigram index, built on first use.
+def creator_key(name):
+    return unicodedata.normalize("NFKC", str(name)).strip().lstrip("@").strip().casefold()
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CreatorIndex:
+    def __init__(self, names):
+        self.names = list(names)
+        self._rows = {}
+        for row, name in enumerate(self.names):
+            self._rows.setdefault(creator_key(name), []).append(row)
+        self._keys = None
+        self._postings = None
+        self._sizes = None
+
+    def lookup(self, queries):
+        # (rows of every name matching a query, in query order, and the
+        # queries that matched nothing); repeated queries count once
+        rows, missing, seen = [], [], set()
+        for q in queries:
+            key = creator_key(q)
+            if key in seen:
+                continue
+            seen.add(key)
+            found = self._rows.get(key)
+            if found:
+                rows.extend(found)
+            else:
+                missing.append(q)
+        return rows, missing
+
+    def _build_trigrams(self):
+        self._keys = list(self._rows)
+        postings = {}
+        sizes = np.empty(len(self._keys), dtype=np.int32)
+        for i, key in enumerate(self._keys):
+            grams = _trigrams(key)
+            sizes[i] = len(grams)
+            for g in grams:
+                postings.setdefault(g, []).append(i)
+        self._postings = {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+        self._sizes = sizes
+
+    def suggest(self, query, limit=3, min_score=0.3):
+        # Up to `limit` names closest to `query` by trigram overlap (Jaccard)
+        if self._postings is None:
+            self._build_trigrams()
+        grams = _trigrams(creator_key(query))
+        hits = [self._postings[g] for g in grams if g in self._postings]
+        if not hits:
+            return []
+        candidates, shared = np.unique(np.concatenate(hits), return_counts=True)
+        score = shared / (len(grams) + self._sizes[candidates] - shared)
+        best = np.argsort(-score, kind="stable")[:limit]
+        return [self.names[self._rows[self._keys[candidates[i]]][0]] for i in best if score[i] >= min_score]
+
+
+# --- CAMPAIGN PIVOT ---
+# Creator x campaign GMV as a sparse matrix in coordinate form: one entry per
+# (creator row, campaign) pair a creator appears in, with the campaigns as an
+# ordered categorical dimension. Totals, campaign counts and shares are
+# bincounts over those coordinates; a dense block is only built for the
+# creators being shown.
+class CampaignPivot:
+    def __init__(self, creators, campaigns, row, col, gmv, rows):
+        self.creators = creators
+        self.campaigns = pd.CategoricalIndex(campaigns, categories=campaigns, ordered=True, name="campaign")
+        self.row, self.col, self.gmv, self.rows = row, col, gmv, rows
+        n, k = len(creators), len(campaigns)
+        self.totals = np.bincount(row, weights=gmv, minlength=n)
+        self.content = np.bincount(row, weights=rows, minlength=n).astype(np.int64)
+        self.campaign_counts = np.bincount(row, minlength=n)
+        self.campaign_totals = np.bincount(col, weights=gmv, minlength=k)
+
+    def __len__(self):
+        return len(self.creators)
+
+    def recap(self, name_col, gmv_col):
+        return pd.DataFrame({name_col: self.creators, gmv_col: self.totals,
+                             ROWS_COL: self.content, CAMPAIGNS_COL: self.campaign_counts})
+
+    def shares(self):
+        # Each entry's GMV as a fraction of its campaign's total GMV
+        totals = self.campaign_totals[self.col]
+        return np.divide(self.gmv, totals, out=np.zeros_like(self.gmv), where=totals != 0)
+
+    def in_campaigns(self, campaigns):
+        # Rows of the creators with an entry in any of `campaigns` (labels)
+        wanted = np.zeros(len(self.campaigns), dtype=bool)
+        wanted[self.campaigns.get_indexer(campaigns)] = True
+        return np.flatnonzero(np.bincount(self.row[wanted[self.col]], minlength=len(self)))
+
+    def matrix(self, rows=None, values="gmv"):
+        # Dense creators x campaigns frame of GMV ("gmv") or campaign share
+        # ("share") for `rows` (all creators by default)
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        local = np.full(len(self), -1, dtype=np.int64)
+        local[rows] = np.arange(len(rows))
+        keep = local[self.row] >= 0
+        dense = np.zeros((len(rows), len(self.campaigns)))
+        data = self.shares() if values == "share" else self.gmv
+        dense[local[self.row[keep]], self.col[keep]] = data[keep]
+        return pd.DataFrame(dense, index=pd.Index(self.creators[rows], name="creator"), columns=self.campaigns)
+
+
+# --- CAMPAIGN STORE ---
+# Every campaign file ever uploaded, reduced to one entry per (file, creator):
+# GMV sum and row count. Files are keyed by content hash, so uploading the
+# same export again (every session, every rerun) adds nothing; only a new
+# file is read and parsed, or a stored one whose name or GMV column changed,
+# which then replaces what was read from it before.
+#
+# Storage is columnar, Parquet-style, in SQLite: creators are a dictionary
+# table (name <-> integer id) and each file keeps its three columns (creator
+# ids, GMV, rows) as packed numpy arrays in one row. A recap reads the
+# columns of the files in range and aggregates them with numpy, so a year of
+# weekly campaigns recaps without ever touching the raw Excel files, and
+# without a per-row SQL GROUP BY. Pivots are kept in memory until the store
+# changes, through this instance or any other connection on the same file:
+# creator ids are assigned by SQLite, and the cache version includes
+# PRAGMA data_version, which moves whenever another connection commits.
+class CampaignStore:
+    def __init__(self, path=DEFAULT_PATH, max_pivots=8):
+        self.max_pivots = max_pivots
+        self._pivots = OrderedDict()
+        self._indexes = OrderedDict()
+        self._version = 0
+        self._creators = None
+        self._ids = None
+        # Shared by every Streamlit session, so reads take the lock too
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " id INTEGER PRIMARY KEY, hash TEXT NOT NULL UNIQUE, name TEXT NOT NULL,"
+            " day TEXT NOT NULL, added INTEGER NOT NULL, rows INTEGER NOT NULL,"
+            " creators INTEGER NOT NULL, gmv REAL NOT NULL,"
+            " unparsed INTEGER NOT NULL, examples TEXT NOT NULL,"
+            " name_col TEXT NOT NULL DEFAULT '', gmv_col TEXT NOT NULL DEFAULT '');"
+            "CREATE INDEX IF NOT EXISTS files_day ON files (day);"
+            "CREATE TABLE IF NOT EXISTS creators (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);"
+            "CREATE TABLE IF NOT EXISTS columns ("
+            " file_id INTEGER PRIMARY KEY REFERENCES files (id) ON DELETE CASCADE,"
+            " creator_ids BLOB NOT NULL, gmv BLOB NOT NULL, rows BLOB NOT NULL);"
+        )
+        # Stores made before files recorded the columns they were read with
+        known = {row[1] for row in self._conn.execute("PRAGMA table_info(files)")}
+        for column in ("name_col", "gmv_col"):
+            if column not in known:
+                self._conn.execute(f"ALTER TABLE files ADD COLUMN {column} TEXT NOT NULL DEFAULT ''")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.commit()
+
+    def _current_version(self):
+        # Changes with every commit to the file, from here or elsewhere
+        return self._conn.execute("PRAGMA data_version").fetchone()[0], self._version
+
+    def _creator_names(self):
+        # Names by id, and ids by name. Creators are never deleted, so only
+        # the ones added since the last call (by any connection) are read.
+        if self._creators is None:
+            self._creators, self._ids = [""], {}
+        names, ids = self._creators, self._ids
+        for i, name in self._conn.execute("SELECT id, name FROM creators WHERE id >= ? ORDER BY id",
+                                          (len(names),)):
+            names.extend([""] * (i - len(names)))
+            names.append(name)
+            ids[name] = i
+        return names, ids
+
+    def _insert(self, key, name, data, name_col, gmv_col, day):
+        df = read_campaign(data, name)
+        missing = [c for c in (name_col, gmv_col) if c not in df.columns]
+        if missing:
+            raise ValueError(f"kolom {', '.join(missing)} tidak ditemukan")
+        amounts, bad = parse_amounts(df[gmv_col])
+        part = (pd.DataFrame({"creator": df[name_col].astype(str).where(df[name_col].notna()), "gmv": amounts})
+                .groupby("creator", sort=False)
+                .agg(gmv=("gmv", "sum"), rows=("gmv", "size")))
+        examples = df[gmv_col][bad].astype(str).unique()[:UNPARSED_EXAMPLES].tolist()
+
+        with self._lock:
+            try:
+                stored = self._conn.execute("SELECT id, day, name_col, gmv_col FROM files WHERE hash = ?",
+                                            (key,)).fetchone()
+                if stored and stored[2:] == (name_col, gmv_col):
+                    # Another session stored the same file meanwhile
+                    return
+                if stored:
+                    # Read again with other columns: replaces the old entry
+                    day = stored[1]
+                    self._conn.execute("DELETE FROM files WHERE id = ?", (stored[0],))
+                self._conn.executemany("INSERT OR IGNORE INTO creators (name) VALUES (?)",
+                                       ((c,) for c in part.index))
+                _, ids = self._creator_names()
+                file_id = self._conn.execute(
+                    "INSERT INTO files (hash, name, day, added, rows, creators, gmv, unparsed, examples,"
+                    " name_col, gmv_col) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, name, day, int(time.time()), len(df), len(part), float(part["gmv"].sum()),
+                     int(bad.sum()), json.dumps(examples), name_col, gmv_col)
+                ).lastrowid
+                creator_ids = part.index.map(ids).to_numpy(np.int32)
+                self._conn.execute(
+                    "INSERT INTO columns (file_id, creator_ids, gmv, rows) VALUES (?, ?, ?, ?)",
+                    (file_id, creator_ids.tobytes(), part["gmv"].to_numpy(np.float64).tobytes(),
+                     part["rows"].to_numpy(np.int32).tobytes())
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                self._creators = self._ids = None
+                raise
+            self._version += 1
+
+    def add(self, files, name_col, gmv_col, day=None):
+        # Stores the uploads not stored yet (anything with .name and
+        # .getvalue()), dated `day` ("YYYY-MM-DD", today by default). Returns
+        # {file name: error} for uploads that could not be read and
+        # {file name: (count, examples)} for files with GMV cells that are not
+        # amounts, stored ones included. A stored file read with other
+        # columns than `name_col` and `gmv_col` is read again with these.
+        day = day or time.strftime("%Y-%m-%d")
+        errors, unparsed = {}, {}
+        query = "SELECT unparsed, examples FROM files WHERE hash = ? AND name_col = ? AND gmv_col = ?"
+        for f in files:
+            data = f.getvalue()
+            key = content_hash(data)
+            with self._lock:
+                known = self._conn.execute(query, (key, name_col, gmv_col)).fetchone()
+            if known is None:
+                try:
+                    self._insert(key, f.name, data, name_col, gmv_col, day)
+                except Exception as e:
+                    errors[f.name] = str(e)
+                    continue
+                with self._lock:
+                    known = self._conn.execute(query, (key, name_col, gmv_col)).fetchone()
+            if known[0]:
+                unparsed[f.name] = (known[0], json.loads(known[1]))
+        return errors, unparsed
+
+    def remove(self, file_ids):
+        with self._lock:
+            self._conn.executemany("DELETE FROM files WHERE id = ?", ((int(i),) for i in file_ids))
+            self._conn.commit()
+            self._version += 1
+
+    def campaigns(self):
+        # Stored files, newest campaign first
+        with self._lock:
+            return pd.read_sql_query(
+                "SELECT id, name, day, rows, creators, gmv, unparsed FROM files ORDER BY day DESC, id DESC",
+                self._conn
+            )
+
+    def columns(self, since=None, until=None):
+        # The stored columns of the campaigns dated `since`..`until`
+        # (inclusive, "YYYY-MM-DD", open-ended by default), concatenated:
+        # (campaign labels, campaign index per entry, creator ids, GMV, rows).
+        # Campaigns are labelled by file name, plus the date where two files
+        # share a name.
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT f.name || CASE WHEN (SELECT COUNT(*) FROM files o WHERE o.name = f.name) > 1"
+                " THEN ' (' || f.day || ', #' || f.id || ')' ELSE '' END,"
+                " c.creator_ids, c.gmv, c.rows FROM files f JOIN columns c ON c.file_id = f.id"
+                " WHERE f.day >= ? AND f.day <= ? ORDER BY f.day, f.id",
+                (since or "0000-00-00", until or "9999-99-99")
+            ).fetchall()
+        creator_ids = [np.frombuffer(r[1], dtype=np.int32) for r in rows]
+        return ([r[0] for r in rows],
+                np.repeat(np.arange(len(rows), dtype=np.int32), [len(c) for c in creator_ids]),
+                np.concatenate(creator_ids or [np.empty(0, np.int32)]),
+                np.concatenate([np.frombuffer(r[2], dtype=np.float64) for r in rows] or [np.empty(0)]),
+                np.concatenate([np.frombuffer(r[3], dtype=np.int32) for r in rows] or [np.empty(0, np.int32)]))
+
+    def pivot(self, since=None, until=None):
+        # CampaignPivot over the campaigns dated `since`..`until`, kept until
+        # the store changes
+        with self._lock:
+            rkey = (self._current_version(), since, until)
+            if rkey in self._pivots:
+                self._pivots.move_to_end(rkey)
+                return self._pivots[rkey]
+            campaigns, campaign_idx, creator_ids, gmv, rows = self.columns(since, until)
+            names, _ = self._creator_names()
+        # Creator ids are dense, so a lookup table turns them into rows
+        present = np.flatnonzero(np.bincount(creator_ids, minlength=len(names)))
+        row_of = np.zeros(len(names), dtype=np.int32)
+        row_of[present] = np.arange(len(present), dtype=np.int32)
+        out = CampaignPivot(np.array(names, dtype=object)[present], campaigns,
+                            row_of[creator_ids], campaign_idx, gmv, rows)
+        with self._lock:
+            self._pivots[rkey] = out
+            while len(self._pivots) > self.max_pivots:
+                self._pivots.popitem(last=False)
+        return out
+
+    def recap(self, name_col, gmv_col, since=None, until=None):
+        # One row per creator over the campaigns dated `since`..`until`,
+        # in CampaignPivot row order
+        return self.pivot(since, until).recap(name_col, gmv_col)
+
+    def creator_index(self, since=None, until=None):
+        # CreatorIndex over the rows of recap(..., since, until); kept until
+        # the store changes, like the pivots
+        with self._lock:
+            ikey = (self._current_version(), since, until)
+            if ikey in self._indexes:
+                self._indexes.move_to_end(ikey)
+                return self._indexes[ikey]
+        index = CreatorIndex(self.pivot(since, until).creators)
+        with self._lock:
+            self._indexes[ikey] = index
+            while len(self._indexes) > self.max_pivots:
+                self._indexes.popitem(last=False)
+        return index
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,190 @@
+import csv
+import io
+import os
+import zipfile
+from xml.etree import ElementTree
+from xml.etree.ElementTree import iterparse
+
+SUPPORTED_TYPES = ["xlsx", "csv", "parquet", "txt"]
+
+XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+
+class ColumnNotFound(ValueError):
+    pass
+
+
+class UnsupportedFileType(ValueError):
+    pass
+
+
+# --- COLUMN READERS ---
+# Each reader streams the values of one column, row by row, without building
+# a DataFrame or touching the other columns more than the format forces it
+# to. `source` is a path or a binary file object such as a Streamlit upload.
+def _values_xlsx(source, column):
+    # python-calamine (Rust) when installed, otherwise a stdlib pass over the
+    # sheet XML that only decodes cells in the wanted column; both several
+    # times faster than pandas/openpyxl building every cell of every row
+    try:
+        from python_calamine import CalamineWorkbook
+    except ImportError:
+        CalamineWorkbook = None
+    if CalamineWorkbook is not None:
+        wb = (CalamineWorkbook.from_path(source) if isinstance(source, (str, os.PathLike))
+              else CalamineWorkbook.from_filelike(source))
+        sheet = wb.get_sheet_by_index(0)
+        yield from _by_header(sheet.iter_rows() if hasattr(sheet, "iter_rows") else sheet.to_python(), column)
+        return
+
+    with zipfile.ZipFile(source) as z:
+        shared = _shared_strings(z)
+        with z.open(_first_sheet(z)) as f:
+            target = None
+            for _, row in iterparse(f):
+                if row.tag != XLSX_NS + "row":
+                    continue
+                if target is None:
+                    header = {_cell_column(c, i): _cell_value(c, shared) for i, c in enumerate(row)}
+                    names = {str(v).strip(): col for col, v in header.items() if v is not None}
+                    if column not in names:
+                        raise ColumnNotFound(column)
+                    target = names[column]
+                else:
+                    for i, c in enumerate(row):
+                        if _cell_column(c, i) == target:
+                            yield _cell_value(c, shared)
+                            break
+                row.clear()
+
+
+def _first_sheet(z):
+    sheet = ElementTree.fromstring(z.read("xl/workbook.xml")).find(f"{XLSX_NS}sheets/{XLSX_NS}sheet")
+    rels = ElementTree.fromstring(z.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels:
+        if rel.get("Id") == sheet.get(REL_NS + "id"):
+            target = rel.get("Target")
+            return target.lstrip("/") if target.startswith("/") else "xl/" + target
+    return "xl/worksheets/sheet1.xml"
+
+
+def _shared_strings(z):
+    if "xl/sharedStrings.xml" not in z.namelist():
+        return []
+    strings = []
+    with z.open("xl/sharedStrings.xml") as f:
+        for _, el in iterparse(f):
+            if el.tag == XLSX_NS + "si":
+                strings.append("".join(t.text or "" for t in el.iter(XLSX_NS + "t")))
+                el.clear()
+    return strings
+
+
+def _cell_column(cell, position):
+    # "B12" -> "B"; cells written without a reference count by position
+    ref = cell.get("r")
+    return ref.rstrip("0123456789") if ref else position
+
+
+def _cell_value(cell, shared):
+    kind = cell.get("t")
+    if kind == "inlineStr":
+        return "".join(t.text or "" for t in cell.iter(XLSX_NS + "t"))
+    v = cell.find(XLSX_NS + "v")
+    if v is None or v.text is None:
+        return None
+    if kind == "s":
+        return shared[int(v.text)]
+    if kind in ("str", "e"):
+        return v.text
+    if kind == "b":
+        return v.text == "1"
+    # Integers as written, so long IDs do not lose digits through a float
+    try:
+        return int(v.text)
+    except ValueError:
+        return float(v.text)
+
+
+def _rows_csv(source):
+    f = (open(source, newline="", encoding="utf-8-sig") if isinstance(source, (str, os.PathLike))
+         else io.TextIOWrapper(source, encoding="utf-8-sig", newline=""))
+    try:
+        yield from csv.reader(f)
+    finally:
+        if isinstance(source, (str, os.PathLike)):
+            f.close()
+        else:
+            # Leave the caller's file open
+            f.detach()
+
+
+def _by_header(rows, column):
+    rows = iter(rows)
+    header = [str(h).strip() if h is not None else "" for h in next(rows, [])]
+    if column not in header:
+        raise ColumnNotFound(column)
+    i = header.index(column)
+    for row in rows:
+        if i < len(row):
+            yield row[i]
+
+
+def _values_parquet(source, column):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet needs pyarrow (pip install pyarrow)")
+    pf = pq.ParquetFile(source)
+    if column not in pf.schema_arrow.names:
+        raise ColumnNotFound(column)
+    for batch in pf.iter_batches(columns=[column], batch_size=65536):
+        yield from batch.column(0).to_pylist()
+
+
+def _values_txt(source, column):
+    f = (open(source, "rb") if isinstance(source, (str, os.PathLike)) else source)
+    try:
+        for n, line in enumerate(f):
+            value = line.decode("utf-8-sig" if n == 0 else "utf-8", errors="ignore").strip()
+            # A list may start with its column name as a header
+            if n == 0 and value == column:
+                continue
+            yield value
+    finally:
+        if f is not source:
+            f.close()
+
+
+def iter_column(source, column, name=None):
+    # Non-empty values of `column` as stripped strings, in file order. The
+    # format comes from the extension of `name`, or of the path / upload name.
+    name = name or getattr(source, "name", None) or str(source)
+    ext = os.path.splitext(name)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        values = _values_xlsx(source, column)
+    elif ext == ".csv":
+        values = _by_header(_rows_csv(source), column)
+    elif ext == ".parquet":
+        values = _values_parquet(source, column)
+    elif ext == ".txt":
+        values = _values_txt(source, column)
+    else:
+        # Read as text lists, .xls or .tsv only produce junk URLs
+        raise UnsupportedFileType(f"unsupported file type {ext or '(none)'!r} for {name}; "
+                                  f"use one of {', '.join(SUPPORTED_TYPES)}")
+
+    for v in values:
+        # None and float NaN are blanks; whole floats are IDs Excel mangled
+        if v is None or v != v:
+            continue
+        if isinstance(v, float) and v.is_integer():
+            v = int(v)
+        v = str(v).strip()
+        if v:
+            yield v
+
+
+def read_column(source, column, name=None):
+    return list(iter_column(source, column, name))
@@ -0,0 +1,327 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+
+import engine
+from cache import ResultCache
+from export import XlsxStreamWriter
+from journal import Journal
+from ratelimit import AdaptiveRateLimiter
+from retry import RetryQueue
+from sessions import SessionManager
+from telemetry import Telemetry
+from tokens import TokenPool
+
+# Server-wide caps. Every job runs on the one shared browser, one job's turn
+# at a time, so these bound what all analysts together can throw at TikTok
+MAX_SESSIONS = int(os.environ.get("TIKTOK_MAX_SESSIONS", 8))
+MAX_PER_SESSION = int(os.environ.get("TIKTOK_MAX_PER_SESSION", 4))
+MAX_RATE = float(os.environ.get("TIKTOK_MAX_RATE", 10.0))
+# Videos (or creators) a job scrapes per turn on the browser before the
+# next queued job gets one
+TURN_VIDEOS = int(os.environ.get("TIKTOK_TURN_VIDEOS", 200))
+TURN_CREATORS = int(os.environ.get("TIKTOK_TURN_CREATORS", 10))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+URL_JOB = "urls"
+CREATOR_JOB = "creators"
+
+
+# --- JOB ---
+# Everything the UI shows about one batch. Progress is written from the
+# session manager's thread and read from any script run, so the log is a
+# bounded ring buffer and mutations go through a lock. Once the job is done
+# it holds the counts, a preview of the first `preview_rows` results, the
+# failed records and the path of the streamed workbook.
+class Job:
+    def __init__(self, kind, label, total, owner=None, log_lines=10, preview_rows=1000):
+        self.id = uuid.uuid4().hex[:8]
+        self.kind = kind
+        self.label = label
+        self.owner = owner
+        self.total = total
+        self.status = QUEUED
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.error = None
+        self.preview_rows = preview_rows
+        self.done = 0
+        self.videos = 0
+        self.counts = {}
+        self.last_url = ""
+        self.ok_count = 0
+        self.preview = []
+        self.failed = []
+        self.output = None
+        self.cache = None
+        self.journal = None
+        self.limiter = None
+        self.retries = None
+        self.token_pool = None
+        self.telemetry = Telemetry()
+        self.future = None
+        self._logs = deque(maxlen=log_lines)
+        self._lock = threading.Lock()
+
+    @property
+    def is_finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def skipped(self):
+        # Cache hits and resumed rows are counted up front, never per row
+        return (self.cache.hits if self.cache else 0) + (self.journal.resumed if self.journal else 0)
+
+    @property
+    def progress(self):
+        if self.status == DONE: return 1.0
+        return min((self.skipped + self.done) / self.total, 1.0) if self.total else 0.0
+
+    def record(self, outcome, line, url=""):
+        with self._lock:
+            self.done += 1
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+            self._logs.append(line)
+            self.last_url = url or self.last_url
+
+    def logs(self):
+        with self._lock:
+            return list(self._logs)
+
+    def outcome_summary(self):
+        with self._lock:
+            counts = dict(self.counts)
+        ok = counts.pop("ok", 0)
+        failed = " · ".join(f"{n} {k}" for k, n in sorted(counts.items()))
+        return f"✓ {ok} ok · ✗ {sum(counts.values())} failed" + (f" ({failed})" if failed else "")
+
+    def finish(self, res, fail):
+        self.ok_count = len(res)
+        self.preview = res[:self.preview_rows]
+        self.failed = fail
+
+    def finish_table(self, table, index, urls):
+        # Same from a records.RecordTable, fanned out over input rows
+        self.ok_count = table.count(index)[0]
+        self.preview = table.frame(index, urls, limit=self.preview_rows)
+        self.failed = table.failed(index, urls)
+
+    def summary(self):
+        elapsed = (self.finished or time.time()) - self.started if self.started else None
+        return {
+            "job": self.id,
+            "input": self.label,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": f"{self.progress:.0%}",
+            "ok": self.ok_count if self.is_finished else self.counts.get("ok", 0),
+            "failed": len(self.failed) if self.is_finished else self.done - self.counts.get("ok", 0),
+            "submitted": time.strftime("%H:%M:%S", time.localtime(self.created)),
+            "elapsed": f"{elapsed:.0f}s" if elapsed is not None else "",
+        }
+
+
+def _clamp(value, cap):
+    return max(1, min(int(value), cap))
+
+
+def _remove_export(job):
+    # An evicted job can no longer be downloaded, so its workbook goes too
+    if job.output:
+        try:
+            os.remove(job.output)
+        except OSError:
+            pass
+
+
+# --- JOB RUNNER ---
+# Runs scrape jobs on a SessionManager's warm browser, independent of any
+# Streamlit script run: a rerun or a closed tab leaves the job going, and
+# any session can poll it or download its results later. Jobs take turns on
+# the browser (SessionManager.turn), a batch of TURN_VIDEOS or
+# TURN_CREATORS each, round-robin, so a small job started behind a long one
+# waits one batch rather than the whole job. Their concurrency is clamped to
+# the server-wide caps above. The last `keep` finished jobs stay in the table;
+# older ones are dropped along with their workbook.
+# With a webfetch.PageFetcher as `pages`, URL jobs share its HTTP client and
+# only send the browser what plain HTTP could not fetch.
+class JobRunner:
+    def __init__(self, sessions=None, keep=50, pages=None):
+        self.sessions = sessions or SessionManager()
+        self.keep = keep
+        self.pages = pages
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return sorted(self.jobs.values(), key=lambda j: j.created, reverse=True)
+
+    def queued_ahead(self, job):
+        return sum(1 for j in self.list() if not j.is_finished and j.created < job.created)
+
+    def _add(self, job, make_coro):
+        with self._lock:
+            finished = sorted((j for j in self.jobs.values() if j.is_finished), key=lambda j: j.created)
+            for old in finished[:max(0, len(finished) - self.keep + 1)]:
+                del self.jobs[old.id]
+                _remove_export(old)
+            self.jobs[job.id] = job
+        job.future = self.sessions.spawn(self._run(job, make_coro))
+        job.future.add_done_callback(lambda f: self._settle(job, f))
+        return job
+
+    def _settle(self, job, future):
+        # A job cancelled before the loop started it never reached _run
+        if future.cancelled() and not job.is_finished:
+            job.status = CANCELLED
+            job.finished = time.time()
+
+    def _turn(self, job):
+        # SessionManager.turn for `job`, which counts as running from its
+        # first turn
+        @asynccontextmanager
+        async def turn():
+            async with self.sessions.turn() as api:
+                if job.status == QUEUED:
+                    job.status = RUNNING
+                    job.started = time.time()
+                yield api
+        return turn
+
+    async def _run(self, job, make_coro):
+        try:
+            await make_coro(self._turn(job))
+            job.status = DONE
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+            raise
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            job.finished = time.time()
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job and job.future and not job.is_finished:
+            job.future.cancel()
+
+    def submit_urls(self, plan, tokens, label, num_sessions=2, per_session=2, max_rate=3.0,
+                    cache_ttl=None, job_key=None, resume=True, history=None, owner=None):
+        # `cache_ttl` in seconds, None for no cache; `job_key` names the
+        # checkpoint journal so an interrupted upload resumes where it stopped.
+        # With a tracking.StatHistory every video is tracked and each fresh
+        # scrape stored as a snapshot.
+        job = Job(URL_JOB, label, len(plan.fetch_urls), owner=owner)
+        num_sessions = _clamp(num_sessions, MAX_SESSIONS)
+        per_session = _clamp(per_session, MAX_PER_SESSION)
+        job.limiter = AdaptiveRateLimiter(max_rate=min(max_rate, MAX_RATE))
+        job.retries = RetryQueue()
+        job.token_pool = TokenPool(tokens)
+
+        async def scrape(turn):
+            if plan.short_links:
+                await plan.resolve()
+                job.total = len(plan.fetch_urls)
+            rows_for = plan.rows_by_fetch()
+            written = set()
+            job.cache = ResultCache(ttl=cache_ttl) if cache_ttl is not None else None
+            job.journal = Journal(job_key) if job_key else None
+            if job.journal and not resume:
+                job.journal.discard()
+            writer = XlsxStreamWriter()
+            job.output = writer.path
+            if history:
+                history.track(plan.fetch_urls)
+
+            def write_rows(idx, data):
+                for row in rows_for.get(idx, []):
+                    writer.write({**data, "video_url": plan.rows[row]})
+                written.add(idx)
+
+            def on_record(idx, data):
+                write_rows(idx, data)
+                if history:
+                    history.record([data])
+                if "error" in data:
+                    job.record(data.get("error_type", "?"), f"✗ [{idx+1}] FAILED ({data.get('error_type', '?')}, {data.get('attempts', 1)} tries) — {data.get('error', 'Unknown error')}", data["video_url"])
+                else:
+                    job.record("ok", f"✓ [{idx+1}] OK — @{data.get('unique_id', '?')} · {engine.format_number(data.get('play_count', 0))} plays", data["video_url"])
+
+            try:
+                records = await engine.run_scraper(
+                    plan.fetch_urls, job.token_pool, num_sessions=num_sessions,
+                    per_session=per_session, limiter=job.limiter, cache=job.cache,
+                    journal=job.journal, on_record=on_record, retries=job.retries,
+                    telemetry=job.telemetry, pages=self.pages, turn=turn,
+                    turn_size=TURN_VIDEOS
+                )
+                # Cached and resumed records never pass through on_record
+                for idx in records.indices():
+                    if idx not in written:
+                        write_rows(idx, records[idx])
+            finally:
+                with job.telemetry.timer("export"):
+                    writer.close()
+                # Hit and miss counts stay readable on a closed cache
+                if job.cache:
+                    job.cache.close()
+            if job.journal:
+                job.journal.discard()
+            job.finish_table(records, plan.row_to_fetch, plan.rows)
+
+        return self._add(job, scrape)
+
+    def submit_creators(self, creators, tokens, label, num_sessions=2, per_session=2,
+                        max_rate=3.0, max_videos=30, cache_ttl=None, owner=None):
+        job = Job(CREATOR_JOB, label, len(creators), owner=owner)
+        num_sessions = _clamp(num_sessions, MAX_SESSIONS)
+        per_session = _clamp(per_session, MAX_PER_SESSION)
+        job.limiter = AdaptiveRateLimiter(max_rate=min(max_rate, MAX_RATE))
+        job.retries = RetryQueue()
+        job.token_pool = TokenPool(tokens)
+
+        async def scrape(turn):
+            # Creator mode writes to the cache but never reads from it
+            cache = ResultCache(ttl=cache_ttl) if cache_ttl is not None else None
+            writer = XlsxStreamWriter()
+            job.output = writer.path
+
+            def on_record(i, records):
+                for data in records:
+                    writer.write(data)
+                if any("error" in r for r in records):
+                    job.record(records[0].get("error_type", "?"), f"✗ @{creators[i]} FAILED — {records[0].get('error', 'Unknown error')}")
+                else:
+                    job.videos += len(records)
+                    job.record("ok", f"✓ @{creators[i]} — {len(records)} videos")
+
+            try:
+                per_creator = await engine.run_creator_scraper(
+                    creators, job.token_pool, num_sessions=num_sessions,
+                    per_session=per_session, max_videos=max_videos, limiter=job.limiter,
+                    cache=cache, on_record=on_record, retries=job.retries,
+                    telemetry=job.telemetry, turn=turn, turn_size=TURN_CREATORS
+                )
+            finally:
+                with job.telemetry.timer("export"):
+                    writer.close()
+                if cache:
+                    cache.close()
+            job.finish(*engine.split_records([r for records in per_creator if records for r in records]))
+
+        return self._add(job, scrape)
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+JOBS_DIR = os.environ.get("TIKTOK_JOBS_DIR", "jobs")
+
+
+def job_id_for(urls):
+    # The same set of URLs always maps to the same job, so re-uploading a
+    # sheet after a crash picks its journal up again
+    h = hashlib.sha1("\n".join(urls).encode("utf-8"))
+    return h.hexdigest()[:12]
+
+
+# --- CHECKPOINT JOURNAL ---
+# One JSON line per finished record, appended as it completes. Every line is
+# flushed to the OS straight away, which is enough to survive a crashed or
+# killed process; fsync (needed only against power loss) is batched to at
+# most once per `fsync_interval` seconds so it stays off the per-record path.
+# A run that completes discards its journal once its output is written, so
+# a journal left on disk always belongs to a job that never finished, and
+# running the same input again scrapes it afresh.
+class Journal:
+    def __init__(self, job_id, directory=JOBS_DIR, fsync_interval=1.0):
+        os.makedirs(directory, exist_ok=True)
+        self.job_id = job_id
+        self.path = os.path.join(directory, f"{job_id}.jsonl")
+        self.fsync_interval = fsync_interval
+        self.resumed = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._last_sync = time.monotonic()
+
+    def load(self):
+        # {url: record}, last line wins; a torn final line from a crash is skipped
+        done = {}
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                done[entry["url"]] = entry["record"]
+        return done
+
+    def _ends_torn(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return False
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def append(self, url, record):
+        line = json.dumps({"url": url, "record": record}, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                torn = self._ends_torn()
+                self._file = open(self.path, "a", encoding="utf-8")
+                # Terminate a torn last line so it does not swallow this one
+                if torn:
+                    self._file.write("\n")
+            self._file.write(line)
+            self._file.flush()
+            now = time.monotonic()
+            if now - self._last_sync >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                self._last_sync = now
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    def discard(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,8 +1,20 @@
+import os
+import sys
+
 import streamlit as st
-import pandas as pd
+
+# gmv.py lives in the repo root, one level up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gmv import CAMPAIGNS_COL, ROWS_COL, CampaignStore
 
 st.set_page_config(page_title="TikTok GMV Recapper", layout="wide")
 
+
+@st.cache_resource(show_spinner=False)
+def get_campaign_store():
+    return CampaignStore()
+
+
 st.title("📊 TikTok Campaign GMV Recapper")
 st.write("Unggah beberapa file campaign untuk melihat total performa creator.")
 
@@ -11,42 +23,44 @@ st.sidebar.header("Pengaturan Kolom")
 name_col = st.sidebar.text_input("Nama Kolom Creator", value="Creator Name")
 gmv_col = st.sidebar.text_input("Nama Kolom GMV", value="GMV")
 
-# 2. Upload File (Bisa banyak file sekaligus)
-uploaded_files = st.file_uploader("Pilih file Excel atau CSV", accept_multiple_files=True, type=['csv', 'xlsx'])
+# 2. Upload File (Bisa banyak file sekaligus), disimpan ke database campaign
+st.sidebar.header("Campaign Tersimpan")
+campaign_day = st.sidebar.date_input("Tanggal campaign untuk file baru")
+since = st.sidebar.date_input("Rekap dari tanggal", value=None)
+until = st.sidebar.date_input("Rekap sampai tanggal", value=None)
+period = (since and since.isoformat(), until and until.isoformat())
 
+store = get_campaign_store()
+uploaded_files = st.file_uploader("Pilih file Excel atau CSV", accept_multiple_files=True, type=['csv', 'xlsx'])
 if uploaded_files:
-    all_data = []
-    
-    for file in uploaded_files:
-        try:
-            if file.name.endswith('.csv'):
-                df = pd.read_csv(file)
-            else:
-                df = pd.read_excel(file)
-            
-            # Tambahkan kolom keterangan nama file agar tahu dari campaign mana
-            df['Source Campaign'] = file.name
-            all_data.append(df)
-        except Exception as e:
-            st.error(f"Gagal membaca file {file.name}: {e}")
-
-    if all_data:
-        # Gabungkan semua data menjadi satu dataframe
-        combined_df = pd.concat(all_data, ignore_index=True)
-        
-        # Bersihkan data GMV (jika ada karakter mata uang atau koma)
-        if combined_df[gmv_col].dtype == 'object':
-            combined_df[gmv_col] = combined_df[gmv_col].replace(r'[\$,R p.]', '', regex=True).astype(float)
+    # File yang sudah tersimpan tidak dibaca ulang; lihat gmv.CampaignStore
+    errors, unparsed = store.add(uploaded_files, name_col, gmv_col, campaign_day.isoformat())
+    for name, e in errors.items():
+        st.error(f"Gagal membaca file {name}: {e}")
+    for name, (n, examples) in unparsed.items():
+        st.warning(f"File {name}: {n} nilai GMV tidak bisa dibaca dan dihitung 0 "
+                   f"(contoh: {', '.join(map(repr, examples))})")
+
+campaigns = store.campaigns()
+if len(campaigns):
+    with st.expander(f"📁 {len(campaigns)} file campaign tersimpan"):
+        st.dataframe(campaigns.drop(columns="id"), use_container_width=True)
+        names = dict(zip(campaigns["id"], campaigns["name"]))
+        remove = st.multiselect("Hapus file dari database", list(names), format_func=names.get)
+        if remove and st.button("Hapus"):
+            store.remove(remove)
+            st.rerun()
 
+    recap_df = store.recap(name_col, gmv_col, *period)
+    if not len(recap_df):
+        st.info("Tidak ada campaign pada periode ini.")
+    else:
         # 3. Fitur Pencarian & Rekap
         st.divider()
         search_query = st.text_input("🔍 Cari Nama Creator / Username (Kosongkan untuk lihat semua)")
 
-        # Grouping Data
-        recap_df = combined_df.groupby(name_col).agg({
-            gmv_col: 'sum',
-            'Source Campaign': 'count'
-        }).rename(columns={'Source Campaign': 'Total Campaign Content'}).reset_index()
+        # Rekap per creator
+        recap_df = recap_df[[name_col, gmv_col, ROWS_COL, CAMPAIGNS_COL]]
 
         # Filter berdasarkan pencarian
         if search_query:
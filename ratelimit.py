@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+
+# --- ADAPTIVE RATE LIMITER ---
+# Token bucket whose refill rate follows AIMD: every `window` seconds with a
+# success in it adds `increase` req/s (max_rate / 20 by default), every
+# failure multiplies the rate by `decrease`. The increase is per window, not
+# per success, so the climb does not speed up with the rate itself and the
+# rate settles just under what the server accepts. Failures are only acted
+# on once per `cooldown` seconds so a burst of errors from requests that
+# were already in flight halves the rate once instead of collapsing it.
+#
+# Anything with the same acquire / success / failure / rate surface can be
+# passed to engine.run_scraper instead.
+class AdaptiveRateLimiter:
+    def __init__(self, rate=0.5, min_rate=0.05, max_rate=5.0,
+                 increase=None, decrease=0.5, burst=1, cooldown=2.0, window=1.0):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = max_rate / 20 if increase is None else increase
+        self.decrease = decrease
+        self.burst = burst
+        self.cooldown = cooldown
+        self.window = window
+        self.successes = 0
+        self.failures = 0
+        self._tokens = burst
+        self._last_refill = time.monotonic()
+        self._last_backoff = 0.0
+        self._last_increase = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    async def acquire(self):
+        # The lock keeps waiters in FIFO order, so one slow acquire cannot be
+        # overtaken by workers that arrived later
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def success(self):
+        self.successes += 1
+        now = time.monotonic()
+        if now - self._last_increase < self.window:
+            return
+        self._last_increase = now
+        self._refill()
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def failure(self):
+        self.failures += 1
+        now = time.monotonic()
+        if now - self._last_backoff < self.cooldown:
+            return
+        self._last_backoff = now
+        # The climb starts over a full window after the cut
+        self._last_increase = now
+        self._refill()
+        self.rate = max(self.min_rate, self.rate * self.decrease)
@@ -0,0 +1,208 @@
+import time
+from array import array
+from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
+
+RECORD_FIELDS = [
+    "video_url", "create_time", "video_id", "author_id", "unique_id", "nickname",
+    "music_title", "is_copyrighted", "play_url", "author_name", "hashtags",
+    "follower_count", "heart_count", "video_count", "like_count", "comment_count",
+    "play_count", "collect_count", "share_count", "repost_count", "scraped_at",
+]
+COUNT_FIELDS = [
+    "follower_count", "heart_count", "video_count", "like_count", "comment_count",
+    "play_count", "collect_count", "share_count", "repost_count",
+]
+TIME_FIELDS = ["create_time", "scraped_at"]
+TEXT_FIELDS = [f for f in RECORD_FIELDS if f not in COUNT_FIELDS and f not in TIME_FIELDS]
+# Text columns whose values repeat across a creator's or a campaign's videos
+SHARED_TEXT = {"author_id", "unique_id", "nickname", "music_title", "author_name", "hashtags"}
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+NO_TIME = -(1 << 63)
+
+EMPTY, OK, FAILED = 0, 1, 2
+
+
+# --- TIMESTAMPS ---
+# Records carry epoch seconds until they are shown or written. Formatting is
+# cached per value: every record scraped in the same second shares one
+# scraped_at string.
+@lru_cache(maxsize=1 << 16)
+def format_time(ts):
+    if ts is None or ts == NO_TIME:
+        return "N/A"
+    return datetime.fromtimestamp(ts).strftime(TIME_FORMAT)
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_time(value):
+    # "YYYY-MM-DD HH:MM:SS" (local) back to epoch seconds, for records read
+    # from the cache or a journal; anything else is None
+    try:
+        return int(time.mktime((int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                                int(value[11:13]), int(value[14:16]), int(value[17:19]), 0, 0, -1)))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def format_times(epochs):
+    # A column of epoch seconds to strings, formatting each distinct value once
+    import numpy as np
+    values, inverse = np.unique(epochs, return_inverse=True)
+    labels = np.array([format_time(int(v)) for v in values], dtype=object)
+    return labels[inverse.reshape(-1)]
+
+
+def to_count(value):
+    # Counters arrive as ints, numeric strings (statsV2) or None; see
+    # engine.raw_record
+    if type(value) is int:
+        return value
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def format_record(record):
+    # A raw record (see engine.raw_record: epoch times) as the record every
+    # writer, cache and journal stores, formatted in place; error records and
+    # stored ones pass through
+    if "error" in record or not isinstance(record.get("scraped_at"), int):
+        return record
+    record["create_time"] = format_time(record["create_time"])
+    record["scraped_at"] = format_time(record["scraped_at"])
+    return record
+
+
+# --- RECORD TABLE ---
+# Results of one run_scraper batch in typed storage instead of as one 21-key
+# dict per video: counters and epoch times packed into one int64 array (a
+# row of INT_FIELDS per video), text in one tuple per video, failures in a
+# side dict. Creator and sound fields are stored as one shared tuple per
+# creator and per sound, and hashtag strings are shared too. Values go in
+# as they are: counters were coerced in engine.raw_record, so a row is
+# copied into the array in one call. Indexing or iterating still yields
+# ordinary record dicts, built on demand, so code written against a list
+# of records keeps working; frame() builds a DataFrame with each column
+# converted in one step.
+INT_FIELDS = COUNT_FIELDS + TIME_FIELDS
+OWN_TEXT = [f for f in TEXT_FIELDS if f not in SHARED_TEXT]
+CREATOR_TEXT = ["author_id", "unique_id", "nickname"]
+SOUND_TEXT = ["music_title", "author_name"]
+# Row text is (own values, creator tuple, sound tuple, hashtags)
+TEXT_LAYOUT = ([(f, 0, i) for i, f in enumerate(OWN_TEXT)]
+               + [(f, 1, i) for i, f in enumerate(CREATOR_TEXT)]
+               + [(f, 2, i) for i, f in enumerate(SOUND_TEXT)]
+               + [("hashtags", 3, None)])
+_ints_of = itemgetter(*INT_FIELDS)
+_own_of = itemgetter(*OWN_TEXT)
+_creator_of = itemgetter(*CREATOR_TEXT)
+_sound_of = itemgetter(*SOUND_TEXT)
+
+
+class RecordTable:
+    def __init__(self, size):
+        self.size = size
+        self._state = bytearray(size)
+        self._ints = array("q", bytes(8 * len(INT_FIELDS) * size))
+        self._text = [None] * size
+        self._errors = {}
+        self._shared = {}
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, idx):
+        state = self._state[idx]
+        if state == FAILED:
+            return self._errors[idx]
+        if state == EMPTY:
+            return None
+        width = len(INT_FIELDS)
+        text = self._text[idx]
+        record = {f: text[group] if i is None else text[group][i] for f, group, i in TEXT_LAYOUT}
+        record.update(zip(INT_FIELDS, self._ints[idx * width:(idx + 1) * width]))
+        for f in TIME_FIELDS:
+            record[f] = format_time(record[f])
+        return {f: record[f] for f in RECORD_FIELDS}
+
+    def __iter__(self):
+        return (self[i] for i in range(self.size))
+
+    def has(self, idx):
+        return self._state[idx] != EMPTY
+
+    def indices(self):
+        return [i for i, state in enumerate(self._state) if state != EMPTY]
+
+    def put(self, idx, record):
+        # Takes raw records (epoch times) and stored ones (formatted times,
+        # from a journal or the cache); `record` itself is left as it is
+        if "error" in record:
+            self._errors[idx] = record
+            self._state[idx] = FAILED
+            return
+        state = self._state
+        if state[idx] == FAILED:
+            del self._errors[idx]
+        try:
+            ints = array("q", _ints_of(record))
+        except (KeyError, TypeError, OverflowError):
+            # Formatted or unreadable times, missing fields
+            record = {f: record.get(f) for f in RECORD_FIELDS}
+            ints = [to_count(record[f]) for f in COUNT_FIELDS]
+            for f in TIME_FIELDS:
+                value = record[f]
+                ts = parse_time(value) if isinstance(value, str) else value
+                ints.append(NO_TIME if ts is None else ts)
+            ints = array("q", ints)
+        width = len(INT_FIELDS)
+        self._ints[idx * width:(idx + 1) * width] = ints
+        shared = self._shared
+        creator = _creator_of(record)
+        sound = _sound_of(record)
+        tags = record["hashtags"]
+        self._text[idx] = (_own_of(record), shared.setdefault(creator, creator),
+                           shared.setdefault(sound, sound), shared.setdefault(tags, tags))
+        state[idx] = OK
+
+    def count(self, index=None):
+        # (ok, failed) over `index`, fetch indices that may repeat (see
+        # urls.UrlPlan.row_to_fetch); all entries by default
+        if index is None:
+            return self._state.count(OK), self._state.count(FAILED)
+        ok = failed = 0
+        for i in index:
+            state = self._state[i]
+            ok += state == OK
+            failed += state == FAILED
+        return ok, failed
+
+    def failed(self, index=None, urls=None):
+        # Failed records over `index`, with `video_url` taken from `urls`
+        # (row-aligned with `index`) when given
+        index = range(self.size) if index is None else index
+        return [{**self._errors[i], "video_url": urls[row]} if urls is not None else self._errors[i]
+                for row, i in enumerate(index) if self._state[i] == FAILED]
+
+    def frame(self, index=None, urls=None, limit=None):
+        # Successful records over `index` as a DataFrame in RECORD_FIELDS
+        # order, at most `limit` rows
+        import numpy as np
+        import pandas as pd
+        index = np.arange(self.size) if index is None else np.asarray(index, dtype=np.int64)
+        ok = np.frombuffer(self._state, dtype=np.uint8)[index] == OK
+        rows = index[ok][:limit]
+        ints = np.frombuffer(self._ints, dtype=np.int64).reshape(self.size, len(INT_FIELDS))[rows]
+        text = [self._text[i] for i in rows]
+        columns = {f: ints[:, i] for i, f in enumerate(COUNT_FIELDS)}
+        columns.update((f, format_times(ints[:, len(COUNT_FIELDS) + i])) for i, f in enumerate(TIME_FIELDS))
+        for f, group, i in TEXT_LAYOUT:
+            values = [t[group] for t in text] if i is None else [t[group][i] for t in text]
+            columns[f] = np.array(values, dtype=object)
+        if urls is not None:
+            columns["video_url"] = np.asarray(urls, dtype=object)[ok][:limit]
+        return pd.DataFrame(columns, columns=RECORD_FIELDS)
@@ -0,0 +1,82 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+
+try:
+    from TikTokApi.exceptions import (
+        CaptchaException, EmptyResponseException, InvalidJSONException, NotFoundException,
+    )
+except ImportError:
+    CaptchaException = EmptyResponseException = InvalidJSONException = NotFoundException = ()
+
+TRANSIENT = "transient"
+THROTTLED = "throttled"
+NOT_FOUND = "not_found"
+PARSE = "parse"
+RETRYABLE = {TRANSIENT, THROTTLED}
+
+NOT_FOUND_HINTS = ("not found", "not exist", "private", "removed", "deleted", "video unavailable", "10204", "10216")
+THROTTLE_HINTS = ("captcha", "verify", "429", "too many", "rate limit", "empty response", "no data returned")
+PARSE_HINTS = ("json", "decode", "parse", "keyerror")
+
+
+# --- ERROR CLASSIFICATION ---
+def classify_error(error):
+    # `error` is an exception or an error message; anything unrecognised is
+    # treated as transient so it gets a bounded number of retries
+    if isinstance(error, NotFoundException): return NOT_FOUND
+    if isinstance(error, (CaptchaException, EmptyResponseException)): return THROTTLED
+    if isinstance(error, (InvalidJSONException, KeyError, ValueError, TypeError)): return PARSE
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)): return TRANSIENT
+
+    msg = str(error).lower()
+    if isinstance(error, BaseException):
+        msg = f"{type(error).__name__} {msg}".lower()
+    if any(h in msg for h in NOT_FOUND_HINTS): return NOT_FOUND
+    if any(h in msg for h in THROTTLE_HINTS): return THROTTLED
+    if any(h in msg for h in PARSE_HINTS): return PARSE
+    return TRANSIENT
+
+
+# --- RETRY QUEUE ---
+# Deferred retries with jittered exponential backoff: attempt n waits
+# base * 2**(n-1) seconds (capped at `cap`), half of it fixed and half random,
+# so retries of a throttled burst do not all land together. Workers drain it
+# only once the main queue is empty, so retries never hold up the first pass.
+class RetryQueue:
+    def __init__(self, max_retries=3, base=5.0, cap=120.0):
+        self.max_retries = max_retries
+        self.base = base
+        self.cap = cap
+        self.attempts = {}
+        self.retried = 0
+        self._heap = []
+        self._seq = itertools.count()
+
+    @property
+    def pending(self):
+        return len(self._heap)
+
+    def attempts_for(self, item):
+        return self.attempts.get(item, 0) + 1
+
+    def defer(self, item, error_type):
+        # Returns False when the item should fail now instead
+        attempt = self.attempts.get(item, 0) + 1
+        if error_type not in RETRYABLE or attempt > self.max_retries:
+            return False
+        self.attempts[item] = attempt
+        delay = min(self.cap, self.base * 2 ** (attempt - 1))
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), item))
+        self.retried += 1
+        return True
+
+    async def next(self):
+        ready_at, _, item = heapq.heappop(self._heap)
+        wait = ready_at - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return item
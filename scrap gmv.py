@@ -1,8 +1,19 @@
 import streamlit as st
 import pandas as pd
 
+from gmv import CAMPAIGNS_COL, CampaignStore
+
 st.set_page_config(page_title="TikTok GMV Bulk Search", layout="wide")
 
+# Creator per halaman matriks GMV per campaign
+MATRIX_PAGE = 200
+
+
+@st.cache_resource(show_spinner=False)
+def get_campaign_store():
+    return CampaignStore()
+
+
 st.title("📊 TikTok Campaign GMV Bulk Recapper")
 st.write("Upload file campaign, lalu masukkan daftar username untuk filter cepat.")
 
@@ -11,26 +22,39 @@ st.sidebar.header("Pengaturan Kolom")
 name_col = st.sidebar.text_input("Nama Kolom Username/Creator", value="Creator Name")
 gmv_col = st.sidebar.text_input("Nama Kolom GMV", value="GMV")
 
-# 2. Upload File (Multi-file)
-uploaded_files = st.file_uploader("Pilih file Excel atau CSV", accept_multiple_files=True, type=['csv', 'xlsx'])
+# 2. Upload File (Multi-file), disimpan ke database campaign
+st.sidebar.header("Campaign Tersimpan")
+campaign_day = st.sidebar.date_input("Tanggal campaign untuk file baru")
+since = st.sidebar.date_input("Rekap dari tanggal", value=None)
+until = st.sidebar.date_input("Rekap sampai tanggal", value=None)
+period = (since and since.isoformat(), until and until.isoformat())
 
+store = get_campaign_store()
+uploaded_files = st.file_uploader("Pilih file Excel atau CSV", accept_multiple_files=True, type=['csv', 'xlsx'])
 if uploaded_files:
-    all_data = []
-    for file in uploaded_files:
-        try:
-            df = pd.read_csv(file) if file.name.endswith('.csv') else pd.read_excel(file)
-            df['Source Campaign'] = file.name # Tandai asal file
-            all_data.append(df)
-        except Exception as e:
-            st.error(f"Gagal membaca file {file.name}: {e}")
-
-    if all_data:
-        combined_df = pd.concat(all_data, ignore_index=True)
-        
-        # Bersihkan format GMV agar jadi angka
-        if combined_df[gmv_col].dtype == 'object':
-            combined_df[gmv_col] = combined_df[gmv_col].replace(r'[\$,R p.]', '', regex=True).astype(float)
+    # File yang sudah tersimpan tidak dibaca ulang; lihat gmv.CampaignStore
+    errors, unparsed = store.add(uploaded_files, name_col, gmv_col, campaign_day.isoformat())
+    for name, e in errors.items():
+        st.error(f"Gagal membaca file {name}: {e}")
+    for name, (n, examples) in unparsed.items():
+        st.warning(f"File {name}: {n} nilai GMV tidak bisa dibaca dan dihitung 0 "
+                   f"(contoh: {', '.join(map(repr, examples))})")
+
+campaigns = store.campaigns()
+if len(campaigns):
+    with st.expander(f"📁 {len(campaigns)} file campaign tersimpan"):
+        st.dataframe(campaigns.drop(columns="id"), use_container_width=True)
+        names = dict(zip(campaigns["id"], campaigns["name"]))
+        remove = st.multiselect("Hapus file dari database", list(names), format_func=names.get)
+        if remove and st.button("Hapus"):
+            store.remove(remove)
+            st.rerun()
 
+    pivot = store.pivot(*period)
+    recap_df = pivot.recap(name_col, gmv_col)
+    if not len(recap_df):
+        st.info("Tidak ada campaign pada periode ini.")
+    else:
         st.divider()
 
         # 3. Fitur Input Banyak Username (Copy-Paste)
@@ -40,25 +64,26 @@ if uploaded_files:
         # Proses daftar username
         list_search = [name.strip() for name in input_usernames.split('\n') if name.strip() != ""]
 
-        # 4. Grouping Data (Total GMV per Creator)
-        recap_df = combined_df.groupby(name_col).agg({
-            gmv_col: 'sum',
-            'Source Campaign': lambda x: ", ".join(x.unique()) # List campaign yang diikuti
-        }).reset_index()
+        # 4. Rekap per creator (total GMV dan jumlah campaign yang diikuti)
+        recap_df = recap_df[[name_col, gmv_col, CAMPAIGNS_COL]]
+        filter_campaigns = st.multiselect("Hanya creator yang ikut campaign", list(pivot.campaigns))
+        if filter_campaigns:
+            recap_df = recap_df.iloc[pivot.in_campaigns(filter_campaigns)]
 
         # 5. Filter Berdasarkan List Username
         if list_search:
-            # Menggunakan isin() untuk mencocokkan banyak nama sekaligus
-            final_df = recap_df[recap_df[name_col].isin(list_search)]
-            
-            # Cek jika ada username yang dicari tapi tidak ditemukan di data
-            found_names = final_df[name_col].tolist()
-            not_found = [n for n in list_search if n not in found_names]
-            
+            # Dicocokkan tanpa beda huruf besar/kecil, "@" dan spasi; lihat gmv.CreatorIndex
+            index = store.creator_index(*period)
+            rows, not_found = index.lookup(list_search)
+            final_df = recap_df.loc[recap_df.index.intersection(rows, sort=False)]
+
             if not_found:
                 st.warning(f"Ada {len(not_found)} username tidak ditemukan dalam file data.")
                 with st.expander("Lihat username yang tidak ditemukan"):
-                    st.write(not_found)
+                    st.dataframe(pd.DataFrame({
+                        "Username": not_found,
+                        "Mungkin maksudnya": [", ".join(index.suggest(n)) for n in not_found],
+                    }), use_container_width=True)
         else:
             final_df = recap_df # Jika kosong, tampilkan semua
 
@@ -76,5 +101,21 @@ if uploaded_files:
             csv = final_df.to_csv(index=False).encode('utf-8')
             st.download_button("📥 Download Hasil (.csv)", csv, "recap_search.csv", "text/csv")
 
+        # 7. GMV per campaign (baris = creator, kolom = campaign). Isi expander
+        # tetap dijalankan di setiap rerun, jadi matriks hanya dibangun jika
+        # diminta, satu halaman MATRIX_PAGE creator sekali tampil
+        with st.expander("📊 GMV per campaign"):
+            if st.toggle("Tampilkan GMV per campaign"):
+                values = st.radio("Nilai", ["GMV", "Share GMV campaign (%)"], horizontal=True)
+                rows = final_df.sort_values(by=gmv_col, ascending=False).index
+                pages = max(1, -(-len(rows) // MATRIX_PAGE))
+                page = st.number_input(f"Halaman (dari {pages}, urut GMV terbesar)", 1, pages, 1) if pages > 1 else 1
+                rows = rows[(page - 1) * MATRIX_PAGE:page * MATRIX_PAGE]
+                matrix = pivot.matrix(rows, "gmv" if values == "GMV" else "share")
+                if values != "GMV":
+                    matrix = matrix * 100
+                # Hanya campaign yang diikuti creator yang tampil
+                st.dataframe(matrix.loc[:, (matrix != 0).any()], use_container_width=True)
+
 else:
     st.info("Silakan unggah file campaign terlebih dahulu.")
@@ -9,6 +9,9 @@ from datetime import datetime
 import io
 import subprocess
 
+from ratelimit import AdaptiveRateLimiter
+from retry import RETRYABLE, THROTTLED, classify_error
+
 # --- CONFIGURATION ---
 logging.getLogger("TikTokApi.tiktok").setLevel(logging.CRITICAL)
 st.set_page_config(page_title="TikTok Scalper Pro", page_icon="📊", layout="wide")
@@ -40,7 +43,7 @@ async def get_video_info(url, api):
         info = await video.info()
         
         if not info:
-            return {"video_url": url, "error": "Data tidak ditemukan (Cek URL/Token)"}
+            return {"video_url": url, "error": "Data tidak ditemukan (Cek URL/Token)", "error_type": THROTTLED}
 
         author = info.get("author", {})
         author_stats = info.get("authorStats", {})
@@ -63,13 +66,16 @@ async def get_video_info(url, api):
             "scraped_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
     except Exception as e:
-        return {"video_url": url, "error": str(e)}
+        return {"video_url": url, "error": str(e), "error_type": classify_error(e)}
 
 # --------- Scraper Engine ---------
 async def run_scraper(video_urls, ms_token):
     results, failed = [], []
     progress_bar = st.progress(0)
     status_text = st.empty()
+    # Jeda antar request diatur otomatis: naik saat sukses, turun hanya saat
+    # di-throttle; video yang tidak ada bukan alasan untuk melambat
+    limiter = AdaptiveRateLimiter()
     
     try:
         async with TikTokApi() as api:
@@ -83,16 +89,21 @@ async def run_scraper(video_urls, ms_token):
             )
 
             for idx, url in enumerate(video_urls):
-                status_text.write(f"⏳ Memproses {idx+1}/{len(video_urls)}: {url}")
+                status_text.write(f"⏳ Memproses {idx+1}/{len(video_urls)} ({limiter.rate:.2f} req/s): {url}")
+                await limiter.acquire()
                 data = await get_video_info(url, api)
                 
-                if "error" in data:
+                error_type = data.get("error_type")
+                if error_type == THROTTLED:
+                    limiter.failure()
+                elif error_type not in RETRYABLE:
+                    limiter.success()
+                if error_type:
                     failed.append(data)
                 else:
                     results.append(data)
                 
                 progress_bar.progress((idx + 1) / len(video_urls))
-                await asyncio.sleep(2) 
     except Exception as e:
         st.error(f"Gagal inisialisasi session: {e}")
             
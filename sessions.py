@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from TikTokApi import TikTokApi
+
+
+# --- WARM SESSION MANAGER ---
+# Owns one TikTokApi (one Chromium) on a private event loop running in a
+# daemon thread, so its sessions outlive Streamlit reruns and are shared by
+# every browser tab on the server. Batches are submitted as coroutine
+# factories taking the api; they run one at a time on the warm sessions and
+# engine.ensure_sessions health-checks and tops those up before each batch.
+# Long jobs instead run unlocked (spawn) and take the browser one turn at a
+# time (turn); waiters are served in order, so jobs alternate turn by turn.
+# The browser is shut down after `idle_timeout` seconds without a batch.
+class SessionManager:
+    def __init__(self, idle_timeout=1800):
+        self.idle_timeout = idle_timeout
+        self.api = None
+        self.last_used = time.monotonic()
+        self.loop = asyncio.new_event_loop()
+        self._lock = asyncio.Lock()
+        self._thread = threading.Thread(target=self._run_loop, name="tiktok-sessions", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._reap_idle(), self.loop)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def _open_api(self):
+        if self.api is not None:
+            browser = getattr(self.api, "browser", None)
+            if browser is None or browser.is_connected():
+                return self.api
+            # Chromium died; start over with a fresh api
+            await self._close_api()
+        self.api = TikTokApi()
+        await self.api.__aenter__()
+        return self.api
+
+    async def _close_api(self):
+        api, self.api = self.api, None
+        if api is not None:
+            try:
+                await api.__aexit__(None, None, None)
+            except Exception:
+                pass
+
+    async def _reap_idle(self):
+        while True:
+            await asyncio.sleep(60)
+            if self.api is not None and not self._lock.locked() \
+                    and time.monotonic() - self.last_used > self.idle_timeout:
+                await self._close_api()
+
+    @asynccontextmanager
+    async def turn(self):
+        # Exclusive use of the browser for one batch
+        async with self._lock:
+            api = await self._open_api()
+            try:
+                yield api
+            finally:
+                self.last_used = time.monotonic()
+
+    async def _run(self, make_coro):
+        async with self.turn() as api:
+            return await make_coro(api)
+
+    def submit(self, make_coro):
+        # Returns a concurrent.futures.Future; make_coro(api) is awaited on
+        # the manager's loop once the previous batch has finished
+        return asyncio.run_coroutine_threadsafe(self._run(make_coro), self.loop)
+
+    def spawn(self, coro):
+        # Runs `coro` on the manager's loop straight away; it takes turns on
+        # the browser itself
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def warm_sessions(self):
+        return len(self.api.sessions) if self.api is not None else 0
+
+    def shutdown(self):
+        asyncio.run_coroutine_threadsafe(self._close_api(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
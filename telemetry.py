@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# Latency buckets in seconds, shared by every histogram so they line up in
+# Prometheus; the top bucket is +Inf
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 7.5, 10, 15, 30, 60, float("inf"))
+
+
+# --- HISTOGRAM ---
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q):
+        # Linear interpolation inside the bucket holding the q-th sample,
+        # the same estimate Prometheus' histogram_quantile makes
+        if not self.count: return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if BUCKETS[i] != float("inf") else lower
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return BUCKETS[-2]
+
+
+# --- TELEMETRY ---
+# Latency histograms per operation ("video_info", "creator_feed",
+# "session_create", "export"), outcome counters by error category, requests
+# per session, and a rolling window of outcomes for throughput and error
+# rate. Updated from the scraper's event loop and read from the UI thread.
+class Telemetry:
+    def __init__(self, window=60, prefix="tiktok_scrape"):
+        self.window = window
+        self.prefix = prefix
+        self.started = time.time()
+        self.histograms = {}
+        self.outcomes = {}
+        self.sessions = {}
+        self._recent = deque(maxlen=100_000)
+        self._inflight = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def observe(self, op, seconds):
+        with self._lock:
+            self.histograms.setdefault(op, Histogram()).observe(seconds)
+
+    @contextmanager
+    def timer(self, op):
+        with self._lock:
+            token = self._next_id
+            self._next_id += 1
+            self._inflight[token] = (op, time.monotonic())
+        try:
+            yield
+        finally:
+            with self._lock:
+                _, started = self._inflight.pop(token)
+            self.observe(op, time.monotonic() - started)
+
+    def record_outcome(self, outcome, session=None):
+        # `outcome` is "ok" or an error category; every attempt counts,
+        # including ones that are retried later
+        now = time.monotonic()
+        with self._lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            if session is not None:
+                self.sessions[session] = self.sessions.get(session, 0) + 1
+            self._recent.append((now, outcome))
+
+    def _window(self):
+        cutoff = time.monotonic() - self.window
+        while self._recent and self._recent[0][0] < cutoff:
+            self._recent.popleft()
+        return list(self._recent)
+
+    def snapshot(self):
+        with self._lock:
+            recent = self._window()
+            elapsed = min(self.window, time.time() - self.started) or 1
+            errors = {}
+            for _, outcome in recent:
+                if outcome != "ok":
+                    errors[outcome] = errors.get(outcome, 0) + 1
+            now = time.monotonic()
+            return {
+                "latency": {
+                    op: {
+                        "count": h.count,
+                        "mean": round(h.sum / h.count, 3) if h.count else None,
+                        "p50": _round(h.quantile(0.5)),
+                        "p95": _round(h.quantile(0.95)),
+                        "p99": _round(h.quantile(0.99)),
+                    } for op, h in self.histograms.items()
+                },
+                "throughput_per_min": round(len(recent) / elapsed * 60, 1),
+                "error_rate": {k: round(v / len(recent), 3) for k, v in errors.items()} if recent else {},
+                "outcomes": dict(self.outcomes),
+                "requests_per_session": dict(self.sessions),
+                "in_flight": len(self._inflight),
+                "oldest_in_flight_s": _round(max((now - t for _, t in self._inflight.values()), default=None)),
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        p = self.prefix
+        lines = [f"# TYPE {p}_latency_seconds histogram"]
+        with self._lock:
+            for op, h in self.histograms.items():
+                cumulative = 0
+                for bound, n in zip(BUCKETS, h.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f'{p}_latency_seconds_bucket{{op="{op}",le="{le}"}} {cumulative}')
+                lines.append(f'{p}_latency_seconds_sum{{op="{op}"}} {h.sum:.6f}')
+                lines.append(f'{p}_latency_seconds_count{{op="{op}"}} {h.count}')
+            lines.append(f"# TYPE {p}_outcomes_total counter")
+            for outcome, n in self.outcomes.items():
+                lines.append(f'{p}_outcomes_total{{outcome="{outcome}"}} {n}')
+            lines.append(f"# TYPE {p}_session_requests_total counter")
+            for session, n in self.sessions.items():
+                lines.append(f'{p}_session_requests_total{{session="{session}"}} {n}')
+            lines.append(f"# TYPE {p}_in_flight gauge")
+            lines.append(f"{p}_in_flight {len(self._inflight)}")
+        return "\n".join(lines) + "\n"
+
+
+def timed(telemetry, op):
+    # Lets call sites time an operation whether or not telemetry is enabled
+    return telemetry.timer(op) if telemetry else nullcontext()
+
+
+def _round(value, digits=3):
+    return round(value, digits) if value is not None else None
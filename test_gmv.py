@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import gmv
+
+# One cell per format gmv.parse_amounts accepts, with its amount
+ACCEPTED = [
+    ("Rp1.234.567,89", 1234567.89),
+    ("Rp 1.234.567", 1234567),
+    ("Rp. 1.234.567", 1234567),
+    ("Rp 1.000", 1000),
+    ("IDR 2.500", 2500),
+    ("$1,234.56", 1234.56),
+    ("1,234.50", 1234.5),
+    ("1.500", 1500),
+    ("1,5", 1.5),
+    ("1.2345", 1.2345),
+    ("1.234.567", 1234567),
+    ("Rp 5.000,-", 5000),
+    ("5.000.000,-", 5000000),
+    ("Rp5.000.-", 5000),
+    ("(1.000)", -1000),
+    ("-Rp 1.000", -1000),
+    ("Rp -1.000", -1000),
+    ("Rp 2,5 rb", 2500),
+    ("3 ribu", 3000),
+    ("10k", 10000),
+    ("1,2 jt", 1200000),
+    ("2 juta", 2000000),
+    ("Rp 1.500 jt", 1500000000),
+    ("2.500 rb", 2500000),
+    ("12,50 jt", 12500000),
+    ("1.5m", 1500000),
+    ("1,5M", 1500000),
+    ("3 mlr", 3000000000),
+    ("2 miliar", 2000000000),
+]
+
+# One cell per shape it turns down, each flagged as unparseable
+REJECTED = ["abc", "Rp", "12 apples", "USD 100", "1e5", "5.000,-,-", "Rp 1.000 dolar", "1.5b",
+            "1 000", "Rp 1 000 000", "1,,5", "1.2.3", "1..000", "1234.567", "1.000,",
+            "1.000 ,5"]
+
+# Blanks are NaN without being flagged
+BLANK = ["", " ", "-", "—", "n/a", "NaN", "None"]
+
+
+def parse(cells):
+    return gmv.parse_amounts(pd.Series(cells, dtype=object))
+
+
+@pytest.mark.parametrize("cell, amount", ACCEPTED)
+def test_accepted(cell, amount):
+    amounts, unparsed = parse([cell])
+    assert amounts[0] == pytest.approx(amount)
+    assert not unparsed[0]
+
+
+@pytest.mark.parametrize("cell", REJECTED)
+def test_rejected(cell):
+    amounts, unparsed = parse([cell])
+    assert np.isnan(amounts[0])
+    assert unparsed[0]
+
+
+@pytest.mark.parametrize("cell", BLANK)
+def test_blank(cell):
+    amounts, unparsed = parse([cell])
+    assert np.isnan(amounts[0])
+    assert not unparsed[0]
+
+
+def generated_cells():
+    # Every short cell of digits, separators and spaces, bare and with a
+    # prefix and sign
+    cells = [""]
+    for _ in range(6):
+        cells = [c + ch for c in cells for ch in "10., "]
+        yield from cells
+        yield from ("Rp " + c for c in cells)
+        yield from ("-" + c for c in cells)
+
+
+def test_plain_decoder_matches_regex():
+    # Every cell the numpy decoder takes must read the same through AMOUNT_RE
+    cells = [cell for cell, _ in ACCEPTED] + REJECTED + list(generated_cells())
+    parsed, plain = gmv._parse_plain(np.array(cells, dtype=object))
+    assert plain.any()
+    for cell, amount, taken in zip(cells, parsed, plain):
+        if taken:
+            assert amount == pytest.approx(gmv._parse_general(cell)), cell
+
+
+def test_mixed_column():
+    # Numbers Excel stored as numbers pass through; cells repeat
+    amounts, unparsed = parse([1500, 2.5, "Rp 5.000,-", None, "abc", "Rp 5.000,-"])
+    assert amounts[:3].tolist() == [1500, 2.5, 5000]
+    assert np.isnan(amounts[3]) and np.isnan(amounts[4])
+    assert unparsed.tolist() == [False, False, False, False, True, False]
+    assert amounts[5] == 5000
+
+
+def test_numeric_column():
+    amounts, unparsed = gmv.parse_amounts(pd.Series([1, 2, 3]))
+    assert amounts.tolist() == [1.0, 2.0, 3.0]
+    assert not unparsed.any()
+
+
+def test_long_cell_skips_plain_decoder():
+    cell = "Rp " + " " * gmv.FAST_WIDTH + "1.000"
+    amounts, unparsed = parse([cell])
+    assert amounts[0] == 1000
+    assert not unparsed[0]
@@ -0,0 +1,118 @@
+import re
+from collections import deque
+
+
+def parse_tokens(text):
+    # One token per line; commas and spaces also work as separators
+    tokens = []
+    for t in re.split(r"[\s,;]+", text or ""):
+        if t and t not in tokens:
+            tokens.append(t)
+    return tokens
+
+def mask_token(token):
+    if len(token) <= 12: return token[:3] + "…"
+    return f"{token[:6]}…{token[-4:]}"
+
+
+# --- TOKEN HEALTH ---
+class TokenHealth:
+    def __init__(self, token, window):
+        self.token = token
+        self.successes = 0
+        self.failures = 0
+        self.sessions = 0
+        self.latency = None
+        self.recent = deque(maxlen=window)
+        self.retired = False
+
+    def success_rate(self):
+        if not self.recent: return 1.0
+        return sum(self.recent) / len(self.recent)
+
+
+# --- TOKEN POOL ---
+# Tracks success rate (over the last `window` requests) and latency (EWMA)
+# per msToken. A token is degraded once it has `min_samples` recent results
+# and falls under `min_success_rate`, or its latency goes over `max_latency`.
+# The engine asks for a replacement when that happens; the degraded token is
+# retired and the least-loaded healthy token takes its session slot.
+class TokenPool:
+    def __init__(self, tokens, window=20, min_samples=5, min_success_rate=0.5,
+                 max_latency=None, alpha=0.2):
+        if not tokens:
+            raise ValueError("TokenPool needs at least one msToken")
+        self.window = window
+        self.min_samples = min_samples
+        self.min_success_rate = min_success_rate
+        self.max_latency = max_latency
+        self.alpha = alpha
+        self.health = {t: TokenHealth(t, window) for t in tokens}
+
+    def healthy(self):
+        return [h for h in self.health.values() if not h.retired]
+
+    def set_sessions(self, tokens):
+        # Session counts as they stand: one per open session on each of
+        # `tokens`, whatever was counted before
+        for h in self.health.values():
+            h.sessions = 0
+        for token in tokens:
+            if token in self.health:
+                self.health[token].sessions += 1
+
+    def assign(self, num_sessions):
+        # Each new session goes to the token with the fewest sessions, so they
+        # spread evenly on top of any already open; extra tokens stay spare
+        candidates = self.healthy() or list(self.health.values())
+        picked = []
+        for _ in range(max(num_sessions, 0)):
+            h = min(candidates, key=lambda c: c.sessions)
+            h.sessions += 1
+            picked.append(h.token)
+        return picked
+
+    def record(self, token, ok, latency=None):
+        h = self.health.get(token)
+        if h is None: return
+        h.recent.append(1 if ok else 0)
+        if ok:
+            h.successes += 1
+        else:
+            h.failures += 1
+        if latency is not None:
+            h.latency = latency if h.latency is None else (
+                self.alpha * latency + (1 - self.alpha) * h.latency
+            )
+
+    def is_degraded(self, token):
+        h = self.health.get(token)
+        if h is None or h.retired: return False
+        if len(h.recent) >= self.min_samples and h.success_rate() < self.min_success_rate:
+            return True
+        return self.max_latency is not None and h.latency is not None and h.latency > self.max_latency
+
+    def replacement(self, token):
+        # Retire `token` and hand back the healthy token with the fewest
+        # sessions. The last healthy token is never retired: a degraded token
+        # still beats stopping the batch.
+        candidates = [h for h in self.healthy() if h.token != token]
+        if not candidates:
+            return None
+        h = self.health[token]
+        h.retired = True
+        h.sessions -= 1
+        best = min(candidates, key=lambda c: (c.sessions, -c.success_rate()))
+        best.sessions += 1
+        return best.token
+
+    def stats(self):
+        return [{
+            "token": mask_token(h.token),
+            "status": "retired" if h.retired else "active",
+            "sessions": h.sessions,
+            "successes": h.successes,
+            "failures": h.failures,
+            "success_rate": round(h.success_rate() * 100),
+            "latency_s": round(h.latency, 2) if h.latency is not None else None,
+        } for h in self.health.values()]
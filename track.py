@@ -0,0 +1,133 @@
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+import time
+
+import engine
+from cli import read_urls, write_metrics
+from ratelimit import AdaptiveRateLimiter
+from telemetry import Telemetry
+from tokens import TokenPool, parse_tokens
+from tracking import DEFAULT_PATH, REPORT_FIELDS, StatHistory
+from urls import UrlPlan
+from webfetch import PageFetcher
+
+# Keeps a campaign's stats as a time series and refreshes each video as
+# often as its numbers are moving:
+#
+#   python track.py add campaign.xlsx
+#   python track.py run --tokens-file tokens.txt --budget 5000 --every 3600
+#   python track.py report -o growth.csv
+#
+# `run` scrapes whatever is due (see tracking.refresh_interval), fastest
+# growing first, within the daily request budget; with --every it keeps
+# going, checking for due videos at that interval.
+
+
+def add(args):
+    plan = UrlPlan(read_urls(args.input, args.column))
+    asyncio.run(plan.resolve())
+    history = StatHistory(args.history)
+    added = history.track(plan.fetch_urls)
+    print(f"{added} new of {len(plan.fetch_urls)} videos tracked", file=sys.stderr)
+    return 0
+
+
+async def refresh(args, history, pool, limiter, telemetry, pages):
+    due = history.due(args.budget)
+    if not due:
+        s = history.summary()
+        print(f"nothing to refresh ({s['due']} due, {s['used_today']} of today's budget used)", file=sys.stderr)
+        return
+    print(f"refreshing {len(due)} videos", file=sys.stderr)
+    started = time.monotonic()
+    records = await engine.run_scraper(
+        due, pool, num_sessions=args.sessions, per_session=args.per_session,
+        limiter=limiter, on_record=lambda i, data: history.record([data]), telemetry=telemetry,
+        pages=pages
+    )
+    ok, failed = records.count()
+    print(f"done: {ok} snapshots, {failed} failed in {time.monotonic() - started:.0f}s",
+          file=sys.stderr)
+
+
+async def run(args):
+    tokens = parse_tokens(" ".join(args.token or []) + " " + os.environ.get("MS_TOKENS", ""))
+    if args.tokens_file:
+        with open(args.tokens_file, encoding="utf-8") as f:
+            tokens += [t for t in parse_tokens(f.read()) if t not in tokens]
+    if not tokens:
+        sys.exit("error: no msToken given (use --token, --tokens-file or MS_TOKENS)")
+
+    history = StatHistory(args.history)
+    pool = TokenPool(tokens)
+    limiter = AdaptiveRateLimiter(max_rate=args.max_rate)
+    telemetry = Telemetry()
+    pages = None if args.browser_only else PageFetcher()
+    try:
+        while True:
+            await refresh(args, history, pool, limiter, telemetry, pages)
+            if not args.every:
+                return 0
+            await asyncio.sleep(args.every)
+    finally:
+        write_metrics(telemetry, args.metrics)
+        if pages:
+            await pages.close()
+
+
+def report(args):
+    history = StatHistory(args.history)
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    fmt = args.format or ("csv" if args.output.endswith(".csv") else "jsonl")
+    try:
+        if fmt == "csv":
+            writer = csv.DictWriter(out, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(history.report())
+        else:
+            for row in history.report():
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Track TikTok video stats over time.")
+    parser.add_argument("--history", default=DEFAULT_PATH, help="stat history database")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("add", help="start tracking the videos in an input file")
+    p.add_argument("input", help="xlsx, csv, parquet or txt file of video URLs, or - for stdin")
+    p.add_argument("--column", default="video_url")
+
+    p = sub.add_parser("run", help="refresh the videos that are due")
+    p.add_argument("--token", action="append", help="msToken (repeatable)")
+    p.add_argument("--tokens-file", help="file with one msToken per line")
+    p.add_argument("--sessions", type=int, default=2)
+    p.add_argument("--per-session", type=int, default=2)
+    p.add_argument("--max-rate", type=float, default=3.0, help="max requests per second")
+    p.add_argument("--budget", type=int, help="max requests per calendar day")
+    p.add_argument("--every", type=float, help="keep running, checking for due videos every N seconds")
+    p.add_argument("--browser-only", action="store_true", help="skip the plain-HTTP page fetch")
+    p.add_argument("--metrics", help="write latency/throughput metrics here (.prom for Prometheus, else JSON)")
+
+    p = sub.add_parser("report", help="latest stats with deltas and velocities")
+    p.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    p.add_argument("--format", choices=["jsonl", "csv"])
+
+    args = parser.parse_args(argv)
+    logging.getLogger("TikTokApi.tiktok").setLevel(logging.CRITICAL)
+    if args.command == "run":
+        return asyncio.run(run(args))
+    return {"add": add, "report": report}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
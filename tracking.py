@@ -0,0 +1,221 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from retry import NOT_FOUND
+from urls import canonical_url, extract_video_id
+
+DEFAULT_PATH = os.environ.get("TIKTOK_HISTORY_PATH", "tiktok_history.sqlite3")
+
+STATS = ("play_count", "like_count", "comment_count", "share_count", "collect_count")
+REPORT_FIELDS = [
+    "video_id", "video_url", "unique_id", "create_time", "last_scraped", "snapshots",
+    *STATS,
+    "play_delta", "like_delta", "share_delta", "hours_since_previous",
+    "play_velocity", "like_velocity", "share_velocity", "play_growth", "next_due",
+]
+
+# Refresh tiers: a video is re-scraped every HOT seconds while it is young
+# or its plays grow by HOT_GROWTH a day or more, every WARM seconds while
+# they grow by WARM_GROWTH, and every COLD seconds once it has gone quiet
+HOT, WARM, COLD = 6 * 3600, 24 * 3600, 7 * 24 * 3600
+HOT_GROWTH, WARM_GROWTH = 0.10, 0.01
+RECENT_DAYS = 3
+RETRY_AFTER = 3600
+
+
+def refresh_interval(age_days, growth_per_day):
+    if age_days is not None and age_days < RECENT_DAYS: return HOT
+    if growth_per_day is None: return WARM
+    if growth_per_day >= HOT_GROWTH: return HOT
+    if growth_per_day >= WARM_GROWTH: return WARM
+    return COLD
+
+
+def _timestamp(value):
+    try:
+        return int(datetime.strptime(value, "%Y-%m-%d %H:%M:%S").timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+# --- STAT HISTORY ---
+# Tracked videos and a compact time series of their counters: one integer
+# row per (video_id, scrape time). Each new snapshot is compared with the one
+# before it to get the play growth per day, which sets when the video is due
+# again (see refresh_interval) and how it ranks against other due videos.
+# Refreshes are drawn from a per-day request budget, fastest movers first.
+class StatHistory:
+    def __init__(self, path=DEFAULT_PATH):
+        # Shared by the UI and the job thread, so reads take the lock too
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS tracked ("
+            " video_id TEXT PRIMARY KEY, video_url TEXT NOT NULL, unique_id TEXT,"
+            " created INTEGER, added INTEGER NOT NULL, last_scraped INTEGER,"
+            " next_due INTEGER NOT NULL, priority REAL NOT NULL DEFAULT 1.0,"
+            " active INTEGER NOT NULL DEFAULT 1);"
+            "CREATE INDEX IF NOT EXISTS tracked_due ON tracked (active, next_due);"
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " video_id TEXT NOT NULL, at INTEGER NOT NULL,"
+            " play_count INTEGER, like_count INTEGER, comment_count INTEGER,"
+            " share_count INTEGER, collect_count INTEGER,"
+            " PRIMARY KEY (video_id, at)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS budget (day TEXT PRIMARY KEY, used INTEGER NOT NULL);"
+        )
+        self._conn.commit()
+
+    def track(self, urls):
+        # Adds videos (due straight away); returns how many were new
+        now = int(time.time())
+        rows = {}
+        for url in urls:
+            video_id = extract_video_id(url)
+            if video_id:
+                rows[video_id] = (video_id, canonical_url(url), now, now)
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tracked (video_id, video_url, added, next_due) VALUES (?, ?, ?, ?)",
+                rows.values()
+            )
+            added = self._conn.total_changes - before
+            # Re-adding a video that had gone missing gives it another chance
+            self._conn.executemany("UPDATE tracked SET active = 1 WHERE video_id = ?",
+                                   [(v,) for v in rows])
+            self._conn.commit()
+            return added
+
+    def _spend(self, n, now):
+        day = time.strftime("%Y-%m-%d", time.localtime(now))
+        self._conn.execute(
+            "INSERT INTO budget (day, used) VALUES (?, ?) ON CONFLICT (day) DO UPDATE SET used = used + ?",
+            (day, n, n)
+        )
+
+    def used_today(self):
+        day = time.strftime("%Y-%m-%d")
+        with self._lock:
+            row = self._conn.execute("SELECT used FROM budget WHERE day = ?", (day,)).fetchone()
+        return row[0] if row else 0
+
+    def due(self, budget=None, now=None):
+        # URLs due for a refresh, highest priority first, capped by what is
+        # left of today's `budget`
+        now = int(now or time.time())
+        limit = -1 if budget is None else max(0, budget - self.used_today())
+        with self._lock:
+            return [u for (u,) in self._conn.execute(
+                "SELECT video_url FROM tracked WHERE active = 1 AND next_due <= ?"
+                " ORDER BY priority DESC, next_due LIMIT ?",
+                (now, limit)
+            )]
+
+    def _previous(self, video_id, at):
+        return self._conn.execute(
+            "SELECT at, play_count FROM snapshots WHERE video_id = ? AND at < ? ORDER BY at DESC LIMIT 1",
+            (video_id, at)
+        ).fetchone()
+
+    def record(self, records):
+        # Stores a snapshot for every successful record and reschedules its
+        # video; failed ones are retried later, or dropped if the video is gone
+        now = int(time.time())
+        with self._lock:
+            for data in records:
+                video_id = data.get("video_id") or extract_video_id(data.get("video_url"))
+                if not video_id:
+                    continue
+                if "error" in data:
+                    if data.get("error_type") == NOT_FOUND:
+                        self._conn.execute("UPDATE tracked SET active = 0 WHERE video_id = ?", (video_id,))
+                    else:
+                        self._conn.execute("UPDATE tracked SET next_due = ? WHERE video_id = ?",
+                                           (now + RETRY_AFTER, video_id))
+                    continue
+
+                at = _timestamp(data.get("scraped_at")) or now
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO snapshots (video_id, at, play_count, like_count, comment_count,"
+                    " share_count, collect_count) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (video_id, at, *(int(data.get(f) or 0) for f in STATS))
+                )
+                created = _timestamp(data.get("create_time"))
+                age_days = (at - created) / 86400 if created else None
+                growth = None
+                prev = self._previous(video_id, at)
+                if prev and prev[1] and at > prev[0]:
+                    growth = (int(data.get("play_count") or 0) - prev[1]) / prev[1] / ((at - prev[0]) / 86400)
+                interval = refresh_interval(age_days, growth)
+                # Young videos without a trend yet rank as if growing at HOT_GROWTH
+                priority = growth if growth is not None else (HOT_GROWTH if interval == HOT else 0.0)
+                self._conn.execute(
+                    "INSERT INTO tracked (video_id, video_url, unique_id, created, added, last_scraped, next_due, priority)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (video_id) DO UPDATE SET unique_id = excluded.unique_id,"
+                    " created = excluded.created, last_scraped = excluded.last_scraped,"
+                    " next_due = excluded.next_due, priority = excluded.priority, active = 1"
+                    " WHERE excluded.last_scraped >= COALESCE(tracked.last_scraped, 0)",
+                    (video_id, canonical_url(data.get("video_url", "")), data.get("unique_id"), created,
+                     now, at, at + interval, priority)
+                )
+            self._spend(len(records), now)
+            self._conn.commit()
+
+    def summary(self):
+        now = int(time.time())
+        with self._lock:
+            tracked, active, due = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(active), 0), COALESCE(SUM(active = 1 AND next_due <= ?), 0) FROM tracked",
+                (now,)
+            ).fetchone()
+            snapshots = self._conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+        return {"tracked": tracked, "active": active, "due": due, "snapshots": snapshots,
+                "used_today": self.used_today()}
+
+    def report(self):
+        # One row per tracked video: its latest counters plus deltas and
+        # per-day velocities against the snapshot before
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT t.video_id, t.video_url, t.unique_id, t.created, t.last_scraped, t.next_due,"
+                " (SELECT COUNT(*) FROM snapshots s WHERE s.video_id = t.video_id)"
+                " FROM tracked t WHERE t.active = 1 ORDER BY t.priority DESC, t.video_id"
+            ).fetchall()
+            # The latest two snapshots of every tracked video
+            pairs = {}
+            for video_id, *snap in self._conn.execute(
+                "SELECT video_id, at, play_count, like_count, comment_count, share_count, collect_count FROM ("
+                " SELECT *, ROW_NUMBER() OVER (PARTITION BY video_id ORDER BY at DESC) AS n FROM snapshots)"
+                " WHERE n <= 2 ORDER BY video_id, at DESC"
+            ):
+                pairs.setdefault(video_id, []).append(snap)
+
+        report = []
+        fmt = lambda ts: datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S") if ts else None
+        for video_id, url, unique_id, created, last_scraped, next_due, n in rows:
+            latest, previous = (pairs.get(video_id, []) + [None, None])[:2]
+            out = {"video_id": video_id, "video_url": url, "unique_id": unique_id,
+                   "create_time": fmt(created), "last_scraped": fmt(last_scraped), "snapshots": n,
+                   "next_due": fmt(next_due)}
+            if latest:
+                out.update(zip(STATS, latest[1:]))
+            if latest and previous:
+                days = (latest[0] - previous[0]) / 86400
+                out["hours_since_previous"] = round(days * 24, 1)
+                for name, i in (("play", 1), ("like", 2), ("share", 4)):
+                    delta = latest[i] - previous[i]
+                    out[f"{name}_delta"] = delta
+                    out[f"{name}_velocity"] = round(delta / days, 1)
+                if previous[1]:
+                    out["play_growth"] = round((latest[1] - previous[1]) / previous[1] / days, 4)
+            report.append({f: out.get(f) for f in REPORT_FIELDS})
+        return report
+
+    def close(self):
+        self._conn.close()
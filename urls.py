@@ -0,0 +1,103 @@
+import asyncio
+import re
+import urllib.request
+from urllib.parse import urlsplit
+
+VIDEO_ID_RE = re.compile(r"/(?:video|photo|v)/(\d{8,})")
+SHORT_HOSTS = {"vm.tiktok.com", "vt.tiktok.com"}
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+
+def extract_video_id(url):
+    if not url: return None
+    m = VIDEO_ID_RE.search(str(url))
+    return m.group(1) if m else None
+
+def clean_url(url):
+    url = str(url).strip()
+    if url and "://" not in url:
+        url = "https://" + url
+    return url
+
+def is_short_link(url):
+    parts = urlsplit(clean_url(url))
+    host = (parts.hostname or "").lower()
+    return host in SHORT_HOSTS or (host.endswith("tiktok.com") and parts.path.startswith("/t/"))
+
+def canonical_url(url):
+    # One URL per video: desktop host, no tracking query, and a path TikTokApi
+    # accepts ("@…/video/<id>"). URLs without an ID are only cleaned.
+    video_id = extract_video_id(url)
+    if not video_id:
+        return clean_url(url)
+    m = re.search(r"/@([^/?#]+)/", str(url))
+    return f"https://www.tiktok.com/@{m.group(1) if m else ''}/video/{video_id}"
+
+
+# --- SHORT LINK RESOLUTION ---
+def _follow_redirects(url, timeout):
+    for method in ("HEAD", "GET"):
+        try:
+            req = urllib.request.Request(url, method=method, headers={"User-Agent": USER_AGENT})
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                if extract_video_id(resp.geturl()):
+                    return resp.geturl()
+        except Exception:
+            continue
+    return url
+
+async def resolve_short_links(urls, concurrency=16, timeout=10):
+    # Returns {short url: resolved url}; links that do not resolve map to themselves
+    sem = asyncio.Semaphore(concurrency)
+
+    async def resolve(url):
+        async with sem:
+            return url, await asyncio.to_thread(_follow_redirects, url, timeout)
+
+    return dict(await asyncio.gather(*[resolve(u) for u in set(urls)]))
+
+
+# --- URL PLAN ---
+# Maps every input row onto one fetch per unique video. `fetch_urls` is what
+# goes to the scraper; `fan_out` copies each fetched record back onto every
+# row that pointed at it, keeping that row's original URL.
+class UrlPlan:
+    def __init__(self, rows):
+        self.rows = [clean_url(r) for r in rows if str(r).strip()]
+        self.resolved = {}
+        self._build()
+
+    def _build(self):
+        self.fetch_urls = []
+        self.row_to_fetch = []
+        seen = {}
+        for url in self.rows:
+            url = self.resolved.get(url, url)
+            key = extract_video_id(url) or canonical_url(url)
+            if key not in seen:
+                seen[key] = len(self.fetch_urls)
+                self.fetch_urls.append(canonical_url(url))
+            self.row_to_fetch.append(seen[key])
+
+    @property
+    def short_links(self):
+        return [u for u in dict.fromkeys(self.rows) if is_short_link(u) and u not in self.resolved]
+
+    async def resolve(self, concurrency=16):
+        if self.short_links:
+            self.resolved.update(await resolve_short_links(self.short_links, concurrency))
+            self._build()
+
+    def rows_by_fetch(self):
+        # {fetch index: [row, ...]} for writing each record out as it arrives
+        rows = {}
+        for row, i in enumerate(self.row_to_fetch):
+            rows.setdefault(i, []).append(row)
+        return rows
+
+    def fan_out(self, records):
+        out = []
+        for url, i in zip(self.rows, self.row_to_fetch):
+            record = records[i]
+            out.append({**record, "video_url": url} if record else None)
+        return out
@@ -0,0 +1,179 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from urllib.parse import urlsplit
+
+from urls import USER_AGENT, canonical_url
+
+DEFAULT_BASE = os.environ.get("TIKTOK_WEB_URL", "https://www.tiktok.com")
+
+REHYDRATION_RE = re.compile(
+    r'<script[^>]*id="(__UNIVERSAL_DATA_FOR_REHYDRATION__|SIGI_STATE)"[^>]*>(.*?)</script>', re.S
+)
+
+
+class VideoUnavailable(RuntimeError):
+    pass
+
+
+# --- PAGE PARSING ---
+# A public video page embeds the same itemStruct TikTokApi's video.info()
+# returns, as JSON in a rehydration <script>. Errors are raised with the
+# wording retry.classify_error keys on: a status code on the page means the
+# video is gone, a page without the script is a captcha or verify wall.
+def parse_video_page(html):
+    m = REHYDRATION_RE.search(html)
+    if not m:
+        raise RuntimeError("No rehydration data in page (captcha or verify wall)")
+    data = json.loads(m.group(2))
+
+    if m.group(1) == "SIGI_STATE":
+        # Older layout: the author is a handle into UserModule
+        items = data.get("ItemModule") or {}
+        if not items:
+            raise VideoUnavailable("Video not found (no ItemModule)")
+        item = next(iter(items.values()))
+        users = data.get("UserModule") or {}
+        handle = item.get("author")
+        return {**item,
+                "author": users.get("users", {}).get(handle) or {"uniqueId": handle},
+                "authorStats": item.get("authorStats") or users.get("stats", {}).get(handle, {})}
+
+    detail = data.get("__DEFAULT_SCOPE__", {}).get("webapp.video-detail")
+    if detail is None:
+        raise RuntimeError("No video detail in rehydration data")
+    if detail.get("statusCode"):
+        raise VideoUnavailable(f"Video unavailable (statusCode {detail['statusCode']}: {detail.get('statusMsg', '')})")
+    item = detail.get("itemInfo", {}).get("itemStruct")
+    if not item:
+        raise RuntimeError("No data returned from TikTok")
+    return item
+
+
+# --- PAGE FETCHER ---
+# Fetches video pages over one pooled HTTP client instead of a browser tab.
+# The client is opened on first use, on the loop doing the fetching, and
+# reopened if that loop changes. `base_url` replaces the scheme and host of
+# every video URL, so a directory of saved pages (see `save` below) served by
+# `python -m http.server` stands in for TikTok.
+#
+# After `max_misses` misses in a row (TikTok walling off plain HTTP clients,
+# say) `enabled` turns false and callers go straight to the browser; once
+# `cooldown` seconds pass without a miss, HTTP is tried again.
+class PageFetcher:
+    def __init__(self, base_url=DEFAULT_BASE, concurrency=16, timeout=10.0, max_misses=20,
+                 cooldown=600.0):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("The HTTP fast path needs httpx (pip install httpx)")
+        self._httpx = httpx
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_misses = max_misses
+        self.cooldown = cooldown
+        self.hits = 0
+        self.misses = 0
+        self._streak = 0
+        self._last_miss = 0.0
+        self._client = None
+        self._loop = None
+
+    @property
+    def enabled(self):
+        return self._streak < self.max_misses or time.monotonic() - self._last_miss > self.cooldown
+
+    def page_url(self, url):
+        return self.base_url + urlsplit(canonical_url(url)).path
+
+    def _client_for_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            if self._client is not None and self._loop.is_running():
+                # The old client's connections belong to its loop, so it is
+                # closed there; a closed loop has taken them down already
+                asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop)
+            self._client = self._httpx.AsyncClient(
+                headers={"User-Agent": USER_AGENT, "Accept-Language": "en-US,en;q=0.9"},
+                limits=self._httpx.Limits(max_connections=self.concurrency,
+                                          max_keepalive_connections=self.concurrency),
+                timeout=self.timeout, follow_redirects=True,
+            )
+            self._loop = loop
+        return self._client
+
+    async def html(self, url):
+        resp = await self._client_for_loop().get(self.page_url(url))
+        if resp.status_code != 200:
+            raise RuntimeError(f"HTTP {resp.status_code} fetching video page")
+        return resp.text
+
+    async def item(self, url):
+        # The video's itemStruct; raises on anything but a clean page. A page
+        # saying the video is gone is still an answer, not a miss.
+        try:
+            item = parse_video_page(await self.html(url))
+        except VideoUnavailable:
+            self.hits += 1
+            self._streak = 0
+            raise
+        except Exception:
+            self.misses += 1
+            self._streak += 1
+            self._last_miss = time.monotonic()
+            raise
+        self.hits += 1
+        self._streak = 0
+        return item
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Saves pages as fixtures, or parses a saved one:
+#
+#   python webfetch.py save https://www.tiktok.com/@user/video/123 -d fixtures
+#   python webfetch.py parse fixtures/@user/video/123
+#   python -m http.server 8000 -d fixtures    # then TIKTOK_WEB_URL=http://127.0.0.1:8000
+async def _save(urls, directory):
+    fetcher = PageFetcher()
+    try:
+        for url in urls:
+            path = os.path.join(directory, urlsplit(canonical_url(url)).path.lstrip("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(await fetcher.html(url))
+            print(path, file=sys.stderr)
+    finally:
+        await fetcher.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch or parse TikTok video pages.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("save", help="save video pages under DIR/@user/video/<id>")
+    p.add_argument("urls", nargs="+")
+    p.add_argument("-d", "--dir", default="fixtures")
+    p = sub.add_parser("parse", help="print the record parsed from a saved page")
+    p.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "save":
+        asyncio.run(_save(args.urls, args.dir))
+        return 0
+    from engine import build_record
+    with open(args.path, encoding="utf-8") as f:
+        info = parse_video_page(f.read())
+    print(json.dumps(build_record(args.path, info), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
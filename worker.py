@@ -0,0 +1,186 @@
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import sys
+
+from TikTokApi import TikTokApi
+
+import engine
+from cache import ResultCache
+from cli import RecordWriter, read_urls, write_metrics
+from journal import job_id_for
+from ratelimit import AdaptiveRateLimiter
+from retry import RetryQueue
+from telemetry import Telemetry
+from tokens import TokenPool, parse_tokens
+from urls import UrlPlan
+from webfetch import PageFetcher
+from workqueue import DEFAULT_PATH, WorkQueue
+
+# Scale scraping out over several processes or hosts sharing one queue:
+#
+#   python worker.py enqueue campaign.xlsx                 # prints the job id
+#   python worker.py work --tokens-file tokens.txt &       # as many as you like
+#   python worker.py status --job 3f2a9c1e7b04
+#   python worker.py export --job 3f2a9c1e7b04 -o results.csv --format csv
+#
+# Each worker leases `--batch` URLs at a time and fetches them over plain
+# HTTP first, keeping one browser for its whole life for the rest; a worker
+# that dies leaves its leases to expire and be picked up by the others after
+# `--visibility` seconds.
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def enqueue(args):
+    plan = UrlPlan(read_urls(args.input, args.column))
+    asyncio.run(plan.resolve())
+    job = args.job or job_id_for(plan.rows)
+    queue = WorkQueue(args.queue)
+    added = queue.enqueue(job, plan.fetch_urls)
+    print(f"job {job}: {added} of {len(plan.fetch_urls)} unique videos queued", file=sys.stderr)
+    print(job)
+    return 0
+
+
+async def work(args):
+    tokens = parse_tokens(" ".join(args.token or []) + " " + os.environ.get("MS_TOKENS", ""))
+    if args.tokens_file:
+        with open(args.tokens_file, encoding="utf-8") as f:
+            tokens += [t for t in parse_tokens(f.read()) if t not in tokens]
+    if not tokens:
+        sys.exit("error: no msToken given (use --token, --tokens-file or MS_TOKENS)")
+
+    worker = args.worker_id or default_worker_id()
+    queue = WorkQueue(args.queue)
+    pool = TokenPool(tokens)
+    # Shared across batches so the learned rate and token health carry over
+    limiter = AdaptiveRateLimiter(max_rate=args.max_rate)
+    cache = None if args.no_cache else ResultCache(ttl=args.ttl * 3600)
+    pages = None if args.browser_only else PageFetcher()
+    telemetry = Telemetry()
+    processed = 0
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(args.visibility / 3)
+            queue.heartbeat(worker, args.visibility)
+
+    print(f"worker {worker} on {args.queue}", file=sys.stderr)
+    try:
+        async with TikTokApi() as api:
+            while True:
+                tasks = queue.lease(worker, args.batch, args.visibility, job=args.job)
+                if not tasks:
+                    if args.drain:
+                        break
+                    await asyncio.sleep(args.poll)
+                    continue
+
+                completed = set()
+
+                def on_record(i, data):
+                    queue.complete([(*tasks[i], data)])
+                    completed.add(i)
+
+                beat = asyncio.create_task(heartbeat())
+                try:
+                    records = await engine.run_scraper(
+                        [url for _, url in tasks], pool, num_sessions=args.sessions,
+                        per_session=args.per_session, limiter=limiter, cache=cache,
+                        on_record=on_record, api=api, retries=RetryQueue(), telemetry=telemetry,
+                        pages=pages
+                    )
+                finally:
+                    beat.cancel()
+                # Cache hits never pass through on_record
+                queue.complete([(*tasks[i], records[i]) for i in records.indices()
+                                if i not in completed])
+                processed += len(tasks)
+                snap = telemetry.snapshot()
+                print(f"{worker}: {processed} done, {snap['throughput_per_min']:.0f}/min, "
+                      f"{limiter.rate:.2f} req/s", file=sys.stderr)
+    finally:
+        queue.release(worker)
+        write_metrics(telemetry, args.metrics)
+        if pages:
+            await pages.close()
+    return 0
+
+
+def status(args):
+    queue = WorkQueue(args.queue)
+    for job in ([args.job] if args.job else queue.jobs()):
+        s = queue.status(job)
+        total = sum(v for k, v in s.items() if k != "workers")
+        print(f"{job}: {s['done'] + s['failed']}/{total} finished ({s['failed']} failed), "
+              f"{s['leased']} leased by {s['workers']} worker(s), {s['expired']} expired, {s['pending']} pending")
+    return 0
+
+
+def export(args):
+    queue = WorkQueue(args.queue)
+    writer = RecordWriter(args.output, args.format)
+    n = 0
+    try:
+        for record in queue.results(args.job):
+            writer.write(record)
+            n += 1
+    finally:
+        writer.close()
+    print(f"{n} records written", file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed TikTok scraping over a shared lease queue.")
+    parser.add_argument("--queue", default=DEFAULT_PATH, help="queue database shared by all workers")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("enqueue", help="queue the videos in an input file")
+    p.add_argument("input", help="xlsx, csv, parquet or txt file of video URLs, or - for stdin")
+    p.add_argument("--column", default="video_url")
+    p.add_argument("--job", help="job id (default: derived from the input)")
+
+    p = sub.add_parser("work", help="lease and scrape batches until stopped")
+    p.add_argument("--job", help="only work on this job")
+    p.add_argument("--worker-id", help="default: hostname-pid")
+    p.add_argument("--token", action="append", help="msToken (repeatable)")
+    p.add_argument("--tokens-file", help="file with one msToken per line")
+    p.add_argument("--sessions", type=int, default=2)
+    p.add_argument("--per-session", type=int, default=2)
+    p.add_argument("--max-rate", type=float, default=3.0, help="max requests per second for this worker")
+    p.add_argument("--batch", type=int, default=50, help="URLs leased at a time")
+    p.add_argument("--visibility", type=float, default=300.0,
+                   help="seconds a lease lasts without a heartbeat before others may take it")
+    p.add_argument("--poll", type=float, default=5.0, help="seconds between polls of an empty queue")
+    p.add_argument("--drain", action="store_true", help="exit once nothing is left to lease")
+    p.add_argument("--ttl", type=float, default=6.0, help="cache freshness in hours")
+    p.add_argument("--no-cache", action="store_true")
+    p.add_argument("--browser-only", action="store_true", help="skip the plain-HTTP page fetch")
+    p.add_argument("--metrics", help="write this worker's metrics here on exit (.prom or JSON)")
+
+    p = sub.add_parser("status", help="show progress per job")
+    p.add_argument("--job")
+
+    p = sub.add_parser("export", help="write a job's finished records")
+    p.add_argument("--job", required=True)
+    p.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    p.add_argument("--format", choices=["jsonl", "csv", "xlsx"], default="jsonl")
+
+    args = parser.parse_args(argv)
+    logging.getLogger("TikTokApi.tiktok").setLevel(logging.CRITICAL)
+    if args.command == "work":
+        try:
+            return asyncio.run(work(args))
+        except KeyboardInterrupt:
+            return 130
+    return {"enqueue": enqueue, "status": status, "export": export}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
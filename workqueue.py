@@ -0,0 +1,167 @@
+import json
+import os
+import sqlite3
+import time
+
+from retry import TRANSIENT
+
+DEFAULT_PATH = os.environ.get("TIKTOK_QUEUE_PATH", "tiktok_queue.sqlite3")
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+
+
+# --- LEASED WORK QUEUE ---
+# Video URLs shared by any number of worker processes, and the store their
+# results go to. lease() hands a worker a batch of URLs and marks them leased
+# until `visibility` seconds from now; the worker extends that with
+# heartbeat() while it works and complete() stores each record. When a
+# worker dies its leases simply expire and the next lease() picks them up
+# again. A URL whose lease has expired `max_attempts` times is failed
+# instead, so one URL that kills workers cannot take the whole fleet down.
+#
+# Every claim runs in a BEGIN IMMEDIATE transaction, so workers on the same
+# database never lease the same URL twice. WAL mode lets readers (status,
+# export) run alongside them. Workers on several hosts need the database on
+# storage with working file locks.
+class WorkQueue:
+    def __init__(self, path=DEFAULT_PATH, max_attempts=3):
+        self.max_attempts = max_attempts
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            " job TEXT NOT NULL, url TEXT NOT NULL, status TEXT NOT NULL,"
+            " lease_owner TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0,"
+            " failed INTEGER NOT NULL DEFAULT 0, record TEXT, updated REAL NOT NULL,"
+            " PRIMARY KEY (job, url))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires)")
+
+    def _transaction(self):
+        return _Transaction(self._conn)
+
+    def enqueue(self, job, urls):
+        # Returns how many URLs were new to the job; re-enqueueing is a no-op
+        now = time.time()
+        with self._transaction():
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tasks (job, url, status, updated) VALUES (?, ?, ?, ?)",
+                [(job, u, PENDING, now) for u in urls]
+            )
+            return self._conn.total_changes - before
+
+    def lease(self, worker, n, visibility=300.0, job=None):
+        # Returns up to `n` [(job, url)], oldest first, from `job` or any job
+        now = time.time()
+        scope, args = ("AND job = ?", [job]) if job else ("", [])
+        with self._transaction():
+            expired = self._conn.execute(
+                f"SELECT rowid, job, url, attempts FROM tasks"
+                f" WHERE status = ? AND lease_expires < ? AND attempts >= ? {scope}",
+                [LEASED, now, self.max_attempts, *args]
+            ).fetchall()
+            for rowid, _, url, attempts in expired:
+                record = {"video_url": url, "error": f"Lease expired {attempts} times",
+                          "error_type": TRANSIENT, "attempts": attempts}
+                self._conn.execute(
+                    "UPDATE tasks SET status = ?, failed = 1, record = ?, lease_owner = NULL, updated = ?"
+                    " WHERE rowid = ?",
+                    [DONE, json.dumps(record, ensure_ascii=False), now, rowid]
+                )
+
+            rows = self._conn.execute(
+                f"SELECT rowid, job, url FROM tasks"
+                f" WHERE (status = ? OR (status = ? AND lease_expires < ?)) {scope}"
+                f" ORDER BY rowid LIMIT ?",
+                [PENDING, LEASED, now, *args, n]
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE tasks SET status = ?, lease_owner = ?, lease_expires = ?,"
+                " attempts = attempts + 1, updated = ? WHERE rowid = ?",
+                [(LEASED, worker, now + visibility, now, rowid) for rowid, _, _ in rows]
+            )
+        return [(j, u) for _, j, u in rows]
+
+    def heartbeat(self, worker, visibility=300.0):
+        now = time.time()
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE tasks SET lease_expires = ?, updated = ? WHERE status = ? AND lease_owner = ?",
+                [now + visibility, now, LEASED, worker]
+            )
+
+    def complete(self, items):
+        # `items` is [(job, url, record)]. A result is kept even if the lease
+        # ran out meanwhile, unless another worker got there first.
+        now = time.time()
+        with self._transaction():
+            self._conn.executemany(
+                "UPDATE tasks SET status = ?, failed = ?, record = ?, lease_owner = NULL, updated = ?"
+                " WHERE job = ? AND url = ? AND status != ?",
+                [(DONE, int("error" in record), json.dumps(record, ensure_ascii=False), now, job, url, DONE)
+                 for job, url, record in items]
+            )
+
+    def release(self, worker):
+        # Hands a stopping worker's unfinished URLs straight back
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE tasks SET status = ?, lease_owner = NULL, lease_expires = NULL,"
+                " attempts = MAX(attempts - 1, 0), updated = ? WHERE status = ? AND lease_owner = ?",
+                [PENDING, time.time(), LEASED, worker]
+            )
+
+    def status(self, job=None):
+        # {"pending", "leased", "expired", "done", "failed", "workers"}
+        now = time.time()
+        scope, args = ("WHERE job = ?", [job]) if job else ("", [])
+        counts = {"pending": 0, "leased": 0, "expired": 0, "done": 0, "failed": 0}
+        rows = self._conn.execute(
+            f"SELECT status, lease_expires < ?, failed, COUNT(*) FROM tasks {scope}"
+            f" GROUP BY status, lease_expires < ?, failed",
+            [now, *args, now]
+        ).fetchall()
+        for status, expired, failed, n in rows:
+            if status == LEASED:
+                counts["expired" if expired else "leased"] += n
+            elif status == DONE:
+                counts["failed" if failed else "done"] += n
+            else:
+                counts["pending"] += n
+        counts["workers"] = self._conn.execute(
+            f"SELECT COUNT(DISTINCT lease_owner) FROM tasks WHERE status = ? AND lease_expires >= ?"
+            f" {'AND job = ?' if job else ''}",
+            [LEASED, now, *args]
+        ).fetchone()[0]
+        return counts
+
+    def jobs(self):
+        return [j for (j,) in self._conn.execute("SELECT DISTINCT job FROM tasks ORDER BY job")]
+
+    def results(self, job):
+        # Finished records in the order their URLs were enqueued
+        for (record,) in self._conn.execute(
+            "SELECT record FROM tasks WHERE job = ? AND status = ? ORDER BY rowid", [job, DONE]
+        ):
+            yield json.loads(record)
+
+    def close(self):
+        self._conn.close()
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE takes the write lock up front, so two workers leasing
+    # at once queue on SQLite's busy timeout instead of deadlocking
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")